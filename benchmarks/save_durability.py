@@ -0,0 +1,75 @@
+"""
+Measure the latency cost of each FileSystemStorage durability policy.
+
+    python benchmarks/save_durability.py --threads 8 --saves 200 --size 16
+"""
+import argparse
+import io
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from flask_lagerung import FileSystemStorage  # noqa: E402
+from flask_lagerung.base import DURABILITY_POLICIES  # noqa: E402
+
+
+def run(storage, threads, saves, payload):
+    latencies = []
+    lock = threading.Lock()
+
+    def worker(index):
+        for i in range(saves):
+            start = time.perf_counter()
+            storage.save("t{}/f{}".format(index, i), io.BytesIO(payload))
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return time.perf_counter() - start, sorted(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--saves", type=int, default=100, help="saves per thread")
+    parser.add_argument("--size", type=int, default=16, help="file size in KiB")
+    parser.add_argument("--interval", type=float, default=0.01, help="batch interval")
+    args = parser.parse_args()
+
+    payload = os.urandom(args.size * 1024)
+    print("{:<10} {:>10} {:>10} {:>10}".format("policy", "saves/s", "p50 ms", "p99 ms"))
+    for durability in DURABILITY_POLICIES:
+        temp_dir = tempfile.mkdtemp()
+        try:
+            storage = FileSystemStorage(
+                location=temp_dir, durability=durability, fsync_interval=args.interval
+            )
+            elapsed, latencies = run(storage, args.threads, args.saves, payload)
+        finally:
+            shutil.rmtree(temp_dir)
+
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        print(
+            "{:<10} {:10.0f} {:10.2f} {:10.2f}".format(
+                durability,
+                len(latencies) / elapsed,
+                statistics.median(latencies) * 1000,
+                p99 * 1000,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
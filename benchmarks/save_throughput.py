@@ -0,0 +1,72 @@
+"""
+Compare FileSystemStorage.save throughput against the plain copy loop in
+64 KiB chunks it replaced, for a large file-backed upload.
+
+    python benchmarks/save_throughput.py --size 512 --repeat 5
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from flask_lagerung import FileSystemStorage  # noqa: E402
+from flask_lagerung.utils import create_chunks, DEFAULT_CHUNK_SIZE  # noqa: E402
+
+
+def chunked_save(path, stream):
+    with open(path, "wb") as f:
+        # pinned, create_chunks picks larger chunks on its own now.
+        for chunk in create_chunks(stream, DEFAULT_CHUNK_SIZE):
+            f.write(chunk)
+
+
+def best_of(repeat, func, target):
+    """Return the best wall clock and CPU time over ``repeat`` runs."""
+    wall, cpu = [], []
+    for _ in range(repeat):
+        if os.path.exists(target):
+            os.remove(target)
+        start, start_cpu = time.perf_counter(), time.process_time()
+        func()
+        wall.append(time.perf_counter() - start)
+        cpu.append(time.process_time() - start_cpu)
+    return min(wall), min(cpu)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=256, help="file size in MiB")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        storage = FileSystemStorage(location=temp_dir)
+        source = os.path.join(temp_dir, "source")
+        with open(source, "wb") as f:
+            block = os.urandom(2 ** 20)
+            for _ in range(args.size):
+                f.write(block)
+
+        chunked = os.path.join(temp_dir, "chunked")
+        with open(source, "rb") as stream:
+            baseline = best_of(
+                args.repeat, lambda: chunked_save(chunked, stream), chunked
+            )
+            optimized = best_of(
+                args.repeat, lambda: storage.save("saved", stream), storage.path("saved")
+            )
+
+        print("{:<15} {:>12} {:>10}".format("", "wall MiB/s", "CPU s"))
+        for label, (wall, cpu) in (("create_chunks", baseline), ("save", optimized)):
+            print("{:<15} {:12.1f} {:10.3f}".format(label, args.size / wall, cpu))
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""
+Measure throughput and latency of the storage operations of
+FileSystemStorage and FTPStorage.
+
+The FTP backend talks to a pyftpdlib server started in this process
+(``pip install pyftpdlib``), optionally delaying every command by
+``--latency`` milliseconds to mimic a remote host. Results are written as
+JSON so that two revisions can be compared:
+
+    python benchmarks/suite.py --output before.json
+    git checkout other-branch
+    python benchmarks/suite.py --output after.json --compare before.json
+"""
+import argparse
+import io
+import json
+import logging
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from flask_lagerung import FileSystemStorage, FTPStorage  # noqa: E402
+
+BACKENDS = ("fs", "ftp")
+USER, PASSWORD = "lagerung", "lagerung"
+
+
+def start_ftp_server(root, latency):
+    """Serve ``root`` over FTP on a free local port, return the server and URL."""
+    from pyftpdlib.authorizers import DummyAuthorizer
+    from pyftpdlib.handlers import FTPHandler
+    from pyftpdlib.servers import ThreadedFTPServer
+
+    class Handler(FTPHandler):
+        def pre_process_command(self, line, cmd, arg):
+            if latency:
+                time.sleep(latency)
+            return super().pre_process_command(line, cmd, arg)
+
+    authorizer = DummyAuthorizer()
+    authorizer.add_user(USER, PASSWORD, root, perm="elradfmwMT")
+    Handler.authorizer = authorizer
+
+    # the server logs every command otherwise.
+    logger = logging.getLogger("pyftpdlib")
+    logger.addHandler(logging.NullHandler())
+    logger.setLevel(logging.WARNING)
+
+    server = ThreadedFTPServer(("127.0.0.1", 0), Handler)
+    server.max_cons = 256
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    port = server.socket.getsockname()[1]
+    return server, "ftp://{}:{}@127.0.0.1:{}/".format(USER, PASSWORD, port)
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[int(round(p * (len(values) - 1)))]
+
+
+def measure(func, calls, concurrency):
+    """Run ``func(*call)`` for every call, return the total time and latencies."""
+
+    def timed(call):
+        start = time.perf_counter()
+        func(*call)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    if concurrency == 1:
+        latencies = [timed(call) for call in calls]
+    else:
+        with ThreadPoolExecutor(concurrency) as executor:
+            latencies = list(executor.map(timed, calls))
+    return time.perf_counter() - start, latencies
+
+
+def record(results, backend, operation, elapsed, latencies, **params):
+    moved = params.get("size", 0) * len(latencies)
+    results.append(
+        dict(
+            backend=backend,
+            operation=operation,
+            count=len(latencies),
+            seconds=elapsed,
+            ops_per_s=len(latencies) / elapsed,
+            mib_per_s=moved / elapsed / 2 ** 20 if moved else None,
+            p50_ms=percentile(latencies, 0.5) * 1e3,
+            p99_ms=percentile(latencies, 0.99) * 1e3,
+            **params
+        )
+    )
+
+
+def read_all(storage, name):
+    with storage.open(name, "rb") as f:
+        while f.read(2 ** 20):
+            pass
+
+
+def bench_files(storage, backend, results, sizes, concurrency_levels, count):
+    """Save, open, probe and delete ``count`` files of every size."""
+    for size in sizes:
+        payload = os.urandom(size)
+        for concurrency in concurrency_levels:
+            prefix = "files-{}-{}".format(size, concurrency)
+            names = [("{}/f{}".format(prefix, i),) for i in range(count)]
+            params = dict(size=size, concurrency=concurrency)
+
+            elapsed, latencies = measure(
+                lambda name: storage.save(name, io.BytesIO(payload)), names, concurrency
+            )
+            record(results, backend, "save", elapsed, latencies, **params)
+
+            elapsed, latencies = measure(
+                lambda name: read_all(storage, name), names, concurrency
+            )
+            record(results, backend, "open", elapsed, latencies, **params)
+
+            elapsed, latencies = measure(storage.exists, names, concurrency)
+            record(results, backend, "exists", elapsed, latencies, concurrency=concurrency)
+
+            elapsed, latencies = measure(storage.delete, names, concurrency)
+            record(results, backend, "delete", elapsed, latencies, concurrency=concurrency)
+
+
+def bench_listdir(storage, backend, results, dir_sizes, concurrency_levels, count):
+    """List directories holding ``dir_sizes`` entries ``count`` times."""
+    for entries in dir_sizes:
+        path = "dir-{}".format(entries)
+        for i in range(entries):
+            storage.save("{}/e{}".format(path, i), io.BytesIO(b"x"))
+
+        for concurrency in concurrency_levels:
+            elapsed, latencies = measure(
+                storage.listdir, [(path,)] * count, concurrency
+            )
+            record(
+                results,
+                backend,
+                "listdir",
+                elapsed,
+                latencies,
+                entries=entries,
+                concurrency=concurrency,
+            )
+
+
+def revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL,
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def key(result):
+    return tuple(
+        result.get(field) for field in ("backend", "operation", "size", "entries", "concurrency")
+    )
+
+
+def compare(results, baseline):
+    """Print the ops/s ratio and p99 change of every result against ``baseline``."""
+    previous = {key(result): result for result in baseline["results"]}
+    print(
+        "{:<4} {:<8} {:>9} {:>7} {:>4} {:>10} {:>10} {:>9}".format(
+            "", "op", "size", "entries", "conc", "ops/s", "ratio", "p99 ms"
+        )
+    )
+    for result in results:
+        old = previous.get(key(result))
+        ratio = result["ops_per_s"] / old["ops_per_s"] if old else float("nan")
+        print(
+            "{:<4} {:<8} {:>9} {:>7} {:>4} {:>10.1f} {:>9.2f}x {:>9.2f}".format(
+                result["backend"],
+                result["operation"],
+                result.get("size", ""),
+                result.get("entries", ""),
+                result["concurrency"],
+                result["ops_per_s"],
+                ratio,
+                result["p99_ms"],
+            )
+        )
+
+
+def int_list(value):
+    return [int(item) for item in value.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--backends", default=",".join(BACKENDS))
+    parser.add_argument(
+        "--sizes", type=int_list, default=[1024, 65536, 2 ** 20], help="file sizes in bytes"
+    )
+    parser.add_argument("--dir-sizes", type=int_list, default=[10, 1000])
+    parser.add_argument("--concurrency", type=int_list, default=[1, 8])
+    parser.add_argument("--count", type=int, default=50, help="calls per measurement")
+    parser.add_argument(
+        "--latency", type=float, default=0, help="delay per FTP command in ms"
+    )
+    parser.add_argument("--output", help="write the JSON results to this file")
+    parser.add_argument("--compare", help="JSON results of a previous run")
+    args = parser.parse_args()
+
+    results = []
+    temp_dir = tempfile.mkdtemp()
+    try:
+        for backend in args.backends.split(","):
+            root = os.path.join(temp_dir, backend)
+            os.makedirs(root)
+            server = None
+            if backend == "fs":
+                storage = FileSystemStorage(location=root)
+            elif backend == "ftp":
+                server, url = start_ftp_server(root, args.latency / 1e3)
+                storage = FTPStorage(location=url, pool_size=max(args.concurrency))
+            else:
+                parser.error("unknown backend {!r}".format(backend))
+
+            try:
+                bench_files(
+                    storage, backend, results, args.sizes, args.concurrency, args.count
+                )
+                bench_listdir(
+                    storage, backend, results, args.dir_sizes, args.concurrency, args.count
+                )
+            finally:
+                if server is not None:
+                    storage.disconnect()
+                    server.close_all()
+    finally:
+        shutil.rmtree(temp_dir)
+
+    report = {
+        "revision": revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "latency_ms": args.latency,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+    elif not args.output:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,23 @@
 from flask import Flask, request
-from flask_lagerung import FileSystemStorage
+from flask_lagerung import Lagerung
 
 app = Flask(__name__)
+app.config["LAGERUNG_STORAGES"] = {
+    "default": "file:media",
+}
 
-storage = FileSystemStorage()
+lagerung = Lagerung(app)
 
 
 @app.route('/upload', methods=['POST'])
 def upload():
     upload_file = request.files['image']
 
-    name = storage.save(upload_file.filename, upload_file.stream)
+    name = lagerung.storage.save(upload_file.filename, upload_file.stream)
 
     return {"msg": name}
+
+
+@app.route('/media/<path:name>')
+def media(name):
+    return lagerung.storage.serve(name)
@@ -1,2 +1,35 @@
+import importlib
+
 from .base import Storage, FileSystemStorage
-from .backends.ftp import FTPStorage, FTPStorageFile
+
+# the rest is imported on first access, so unused backends cost nothing.
+_LAZY = {
+    "BulkResult": ".bulk",
+    "Entry": ".walk",
+    "FTPStorage": ".backends.ftp",
+    "FTPStorageFile": ".backends.ftp",
+    "CachedStorage": ".backends.cache",
+    "DedupStorage": ".backends.dedup",
+    "InstrumentedStorage": ".backends.instrumented",
+    "Metrics": ".metrics",
+    "OperationEvent": ".metrics",
+    "CompressedStorage": ".backends.compressed",
+    "MemoryStorage": ".backends.memory",
+    "Lagerung": ".extension",
+}
+
+__all__ = ["Storage", "FileSystemStorage"] + list(_LAZY)
+
+
+def __getattr__(name):
+    try:
+        module = _LAZY[name]
+    except KeyError:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return __all__
@@ -0,0 +1,70 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .utils import DEFAULT_CHUNK_SIZE
+
+_lock = threading.Lock()
+
+
+def get_executor(storage):
+    """Return the bounded thread pool running ``storage``'s blocking calls."""
+    executor = getattr(storage, "_async_executor", None)
+    if executor is None:
+        with _lock:
+            executor = getattr(storage, "_async_executor", None)
+            if executor is None:
+                executor = ThreadPoolExecutor(
+                    max_workers=storage.async_workers, thread_name_prefix="lagerung"
+                )
+                storage._async_executor = executor
+    return executor
+
+
+async def run(storage, func, *args, **kwargs):
+    """Run the blocking ``func`` in ``storage``'s executor."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_executor(storage), functools.partial(func, *args, **kwargs)
+    )
+
+
+class AsyncFile:
+    """
+    Async wrapper around a file returned by ``Storage.open``. Iterating
+    over it with ``async for`` yields chunks of ``chunk_size`` bytes.
+    """
+
+    def __init__(self, storage, file, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.storage = storage
+        self.file = file
+        self.chunk_size = chunk_size
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await run(self.storage, self.file.__exit__, exc_type, exc_value, traceback)
+
+    def __aiter__(self):
+        return self._chunks()
+
+    async def _chunks(self):
+        while True:
+            data = await self.read(self.chunk_size)
+            if not data:
+                break
+            yield data
+
+    async def read(self, size=-1):
+        return await run(self.storage, self.file.read, size)
+
+    async def write(self, data):
+        return await run(self.storage, self.file.write, data)
+
+    async def seek(self, offset, whence=0):
+        return await run(self.storage, self.file.seek, offset, whence)
+
+    async def close(self):
+        await run(self.storage, self.file.close)
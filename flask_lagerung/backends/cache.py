@@ -0,0 +1,187 @@
+import os
+import threading
+from collections import OrderedDict
+
+from ..base import Storage, TEMP_SUFFIX
+
+
+class CachedStorage(Storage):
+    """
+    Serve reads of a remote storage from a local FileSystemStorage, or a
+    MemoryStorage as a hot tier.
+
+    Misses are filled from ``remote``; concurrent misses on the same name
+    share a single download. The cache is kept under ``max_bytes`` by
+    evicting the least recently read files, and saving or deleting through
+    this storage invalidates the cached copy.
+    """
+
+    def __init__(self, remote, cache, max_bytes):
+        self.remote = remote
+        self.cache = cache
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._size = 0
+        self._filling = {}
+        self._stale = set()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._load()
+
+    def _load(self):
+        """Index the files already in the cache, oldest first."""
+        entries = []
+        # caches that aren't on disk (MemoryStorage) start empty.
+        location = getattr(self.cache, "location", None)
+        if location and os.path.isdir(location):
+            for root, _, files in os.walk(location):
+                for filename in files:
+                    if filename.endswith(TEMP_SUFFIX):
+                        continue
+                    path = os.path.join(root, filename)
+                    stat = os.stat(path)
+                    name = os.path.relpath(path, location)
+                    entries.append((stat.st_mtime, name.replace(os.sep, "/"), stat.st_size))
+
+        for _, name, size in sorted(entries):
+            self._entries[name] = size
+            self._size += size
+        self._evict()
+
+    def _touch(self, name):
+        with self._lock:
+            if name not in self._entries:
+                return False
+            self._entries.move_to_end(name)
+            self.hits += 1
+            return True
+
+    def _evict(self):
+        victims = []
+        with self._lock:
+            while self._size > self.max_bytes and self._entries:
+                name, size = self._entries.popitem(last=False)
+                self._size -= size
+                victims.append(name)
+            self.evictions += len(victims)
+
+        for name in victims:
+            self.cache.delete(name)
+
+    def _invalidate(self, name):
+        with self._lock:
+            size = self._entries.pop(name, None)
+            if size is not None:
+                self._size -= size
+            if name in self._filling:
+                # the download in progress may predate the change.
+                self._stale.add(name)
+        self.cache.delete(name)
+
+    def _fill(self, name, mode):
+        with self._lock:
+            cached = name in self._entries
+            if cached:
+                # filled by a download that ended since open() missed.
+                self._entries.move_to_end(name)
+                self.hits += 1
+            event = self._filling.get(name)
+            owner = event is None and not cached
+            if owner:
+                event = self._filling[name] = threading.Event()
+                self._stale.discard(name)
+                self.misses += 1
+
+        if cached:
+            try:
+                return self.cache.open(name, mode)
+            except FileNotFoundError:
+                self._invalidate(name)
+                return self._fill(name, mode)
+
+        if not owner:
+            event.wait()
+            if self._touch(name):
+                return self.cache.open(name, mode)
+            return self.remote.open(name, mode)
+
+        try:
+            with self.remote.open(name, "rb") as remote_file:
+                self.cache.save(name, remote_file)
+            size = self.cache.size(name)
+            f = self.cache.open(name, mode)
+
+            with self._lock:
+                stale = name in self._stale
+                if not stale:
+                    self._entries[name] = size
+                    self._size += size
+            if stale:
+                self.cache.delete(name)
+            else:
+                self._evict()
+            return f
+        finally:
+            with self._lock:
+                del self._filling[name]
+                self._stale.discard(name)
+            event.set()
+
+    def open(self, name, mode="rb"):
+        if "r" not in mode or "+" in mode:
+            self._invalidate(name)
+            return self.remote.open(name, mode)
+
+        if self._touch(name):
+            try:
+                return self.cache.open(name, mode)
+            except FileNotFoundError:
+                self._invalidate(name)
+        return self._fill(name, mode)
+
+    def save(self, name, content):
+        name = self.remote.save(name, content)
+        self._invalidate(name)
+        return name
+
+    def delete(self, name):
+        self.remote.delete(name)
+        self._invalidate(name)
+
+    def exists(self, name):
+        return self.remote.exists(name)
+
+    def size(self, name):
+        return self.remote.size(name)
+
+    def modified_time(self, name):
+        return self.remote.modified_time(name)
+
+    def listdir(self, path):
+        return self.remote.listdir(path)
+
+    def scandir(self, path):
+        return self.remote.scandir(path)
+
+    def path(self, name):
+        return self.remote.path(name)
+
+    def url(self, name):
+        return self.remote.url(name)
+
+    def stats(self):
+        """Return cache hit, miss and eviction counters and its usage."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+            }
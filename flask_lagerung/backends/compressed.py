@@ -0,0 +1,168 @@
+import io
+import mimetypes
+import os
+import struct
+
+from ..base import Storage
+from ..compression import (
+    CompressingReader,
+    CompressingWriter,
+    DecompressingReader,
+    get_codec,
+)
+
+COMPRESSIBLE_TYPES = {
+    "application/javascript",
+    "application/json",
+    "application/xml",
+    "application/x-ndjson",
+    "image/svg+xml",
+}
+
+
+def is_compressible(name):
+    """Whether ``name`` looks like text, judging by its extension."""
+    mimetype, encoding = mimetypes.guess_type(name)
+    if mimetype is None or encoding is not None:
+        return False
+    return (
+        mimetype.startswith("text/")
+        or mimetype in COMPRESSIBLE_TYPES
+        or mimetype.endswith(("+json", "+xml"))
+    )
+
+
+class CompressedStorage(Storage):
+    """
+    Store compressible files of ``backend`` compressed with ``codec``
+    ("gzip", "zstd" or "brotli"), under their name plus the codec suffix.
+
+    Content is compressed while the backend reads it on save, and
+    decompressed while it is read on open. ``serve`` sends the stored
+    file as is with ``Content-Encoding`` to clients accepting the codec.
+    Whether a name is compressed is decided by ``compressible(name)``,
+    text types by default, so no lookup is needed to find a file.
+    """
+
+    def __init__(self, backend, codec="gzip", level=None, compressible=is_compressible):
+        self.backend = backend
+        self.codec = get_codec(codec)
+        self.level = level
+        self.compressible = compressible
+
+    def _stored(self, name):
+        return name + self.codec.suffix if self.compressible(name) else name
+
+    def save(self, name, content):
+        content = getattr(content, "stream", content)
+        if not self.compressible(name):
+            return self.backend.save(name, content)
+        self.backend.save(self._stored(name), CompressingReader(content, self.codec, self.level))
+        return name
+
+    def open(self, name, mode="rb"):
+        if not self.compressible(name):
+            return self.backend.open(name, mode)
+
+        if mode in ("r", "rb"):
+            f = DecompressingReader(self.backend.open(self._stored(name), "rb"), self.codec)
+            f = io.BufferedReader(f)
+        elif mode in ("w", "wb"):
+            f = CompressingWriter(
+                self.backend.open(self._stored(name), "wb"), self.codec, self.level
+            )
+            f = io.BufferedWriter(f)
+        else:
+            raise ValueError("Compressed files can't be opened with mode {!r}.".format(mode))
+        return io.TextIOWrapper(f, encoding="utf-8") if "b" not in mode else f
+
+    def delete(self, name):
+        return self.backend.delete(self._stored(name))
+
+    def exists(self, name):
+        return self.backend.exists(self._stored(name))
+
+    def size(self, name):
+        """The uncompressed size, which costs reading the whole file but for gzip."""
+        if not self.compressible(name):
+            return self.backend.size(name)
+
+        if self.codec.name == "gzip":
+            # the trailer holds the size modulo 2 ** 32.
+            with self.backend.open(self._stored(name), "rb") as f:
+                f.seek(-4, io.SEEK_END)
+                return struct.unpack("<I", f.read(4))[0]
+
+        size = 0
+        with self.open(name, "rb") as f:
+            while True:
+                data = f.read(2 ** 20)
+                if not data:
+                    return size
+                size += len(data)
+
+    def modified_time(self, name):
+        return self.backend.modified_time(self._stored(name))
+
+    def _unstored(self, name):
+        suffix = self.codec.suffix
+        if name.endswith(suffix) and self.compressible(name[: -len(suffix)]):
+            return name[: -len(suffix)]
+        return name
+
+    def listdir(self, path):
+        directories, files = self.backend.listdir(path)
+        return directories, [self._unstored(filename) for filename in files]
+
+    def scandir(self, path):
+        """Entries of compressed files carry the compressed size."""
+        for entry in self.backend.scandir(path):
+            if not entry.is_dir:
+                entry = entry._replace(name=self._unstored(entry.name))
+            yield entry
+
+    def path(self, name):
+        return self.backend.path(self._stored(name))
+
+    def url(self, name):
+        return self.backend.url(self._stored(name))
+
+    def serve(self, name, mimetype=None, as_attachment=False, download_name=None, **kwargs):
+        """
+        Serve the compressed file as is to clients accepting the codec's
+        ``Content-Encoding``, decompress it for the others.
+        """
+        from flask import request
+
+        if not self.compressible(name):
+            return self.backend.serve(
+                name,
+                mimetype=mimetype,
+                as_attachment=as_attachment,
+                download_name=download_name,
+                **kwargs
+            )
+
+        if not request.accept_encodings.quality(self.codec.encoding):
+            rv = super().serve(
+                name,
+                mimetype=mimetype,
+                as_attachment=as_attachment,
+                download_name=download_name,
+                **kwargs
+            )
+        else:
+            if mimetype is None:
+                mimetype = mimetypes.guess_type(name)[0]
+            if as_attachment and download_name is None:
+                download_name = os.path.basename(name)
+            rv = self.backend.serve(
+                self._stored(name),
+                mimetype=mimetype,
+                as_attachment=as_attachment,
+                download_name=download_name,
+                **kwargs
+            )
+            rv.headers["Content-Encoding"] = self.codec.encoding
+        rv.vary.add("Accept-Encoding")
+        return rv
@@ -0,0 +1,196 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from tempfile import SpooledTemporaryFile
+
+from ..base import Storage
+from ..utils import create_chunks
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    digest TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    refs INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS names (
+    name TEXT PRIMARY KEY,
+    digest TEXT NOT NULL,
+    modified REAL NOT NULL
+);
+"""
+
+
+class DedupStorage(Storage):
+    """
+    Store each distinct content once in ``backend``.
+
+    Content is hashed while it is spooled (in memory up to ``spool_size``
+    bytes), then kept as a blob named after its digest. A sqlite ``index``
+    maps names to digests and counts references to every blob, so saving
+    content that is already stored skips the upload entirely and a blob is
+    deleted with its last reference.
+    """
+
+    def __init__(
+        self, backend, index, algorithm="sha256", prefix="blobs", spool_size=8 * 2 ** 20
+    ):
+        self.backend = backend
+        self.algorithm = algorithm
+        self.prefix = prefix
+        self.spool_size = spool_size
+
+        self._db = sqlite3.connect(index, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        # saves and deletes of the same blob are serialized, others not.
+        self._blob_locks = [threading.Lock() for _ in range(64)]
+
+        self.uploads = 0
+        self.deduplicated = 0
+
+    def _blob_lock(self, digest):
+        return self._blob_locks[int(digest[:8], 16) % len(self._blob_locks)]
+
+    def _blob_name(self, digest):
+        return "{}/{}/{}/{}".format(self.prefix, digest[:2], digest[2:4], digest)
+
+    def _query(self, sql, *args):
+        with self._lock, self._db:
+            return self._db.execute(sql, args).fetchall()
+
+    def _digest(self, name):
+        rows = self._query("SELECT digest FROM names WHERE name = ?", name)
+        if not rows:
+            raise FileNotFoundError("No such file: {}".format(name))
+        return rows[0][0]
+
+    def _spool(self, content):
+        """Copy ``content`` to a spooled file, returning it, its digest and size."""
+        digest = hashlib.new(self.algorithm)
+        spool = SpooledTemporaryFile(max_size=self.spool_size)
+        size = 0
+        for chunk in create_chunks(content, reuse_buffer=True):
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            digest.update(chunk)
+            spool.write(chunk)
+            size += len(chunk)
+        spool.seek(0)
+        return spool, digest.hexdigest(), size
+
+    def _release_blob(self, digest):
+        with self._blob_lock(digest):
+            with self._lock, self._db:
+                self._db.execute("UPDATE blobs SET refs = refs - 1 WHERE digest = ?", (digest,))
+                remaining = self._db.execute(
+                    "SELECT refs FROM blobs WHERE digest = ?", (digest,)
+                ).fetchone()
+                if remaining is not None and remaining[0] <= 0:
+                    self._db.execute("DELETE FROM blobs WHERE digest = ?", (digest,))
+            if remaining is not None and remaining[0] <= 0:
+                self.backend.delete(self._blob_name(digest))
+
+    def save(self, name, content):
+        spool, digest, size = self._spool(content)
+        with spool, self._blob_lock(digest):
+            if self._query("SELECT 1 FROM blobs WHERE digest = ?", digest):
+                self.deduplicated += 1
+            else:
+                self.backend.save(self._blob_name(digest), spool)
+                self.uploads += 1
+                self._query(
+                    "INSERT INTO blobs (digest, size, refs) VALUES (?, ?, 0)", digest, size
+                )
+
+            with self._lock, self._db:
+                self._db.execute("UPDATE blobs SET refs = refs + 1 WHERE digest = ?", (digest,))
+                previous = self._db.execute(
+                    "SELECT digest FROM names WHERE name = ?", (name,)
+                ).fetchone()
+                self._db.execute(
+                    "INSERT OR REPLACE INTO names (name, digest, modified) VALUES (?, ?, ?)",
+                    (name, digest, time.time()),
+                )
+
+        if previous is not None:
+            self._release_blob(previous[0])
+        return name
+
+    def open(self, name, mode="rb"):
+        if mode not in ("r", "rb"):
+            raise ValueError("DedupStorage files can only be opened for reading.")
+        return self.backend.open(self._blob_name(self._digest(name)), "rb")
+
+    def delete(self, name):
+        with self._lock, self._db:
+            row = self._db.execute("SELECT digest FROM names WHERE name = ?", (name,)).fetchone()
+            self._db.execute("DELETE FROM names WHERE name = ?", (name,))
+        if row is not None:
+            self._release_blob(row[0])
+
+    def exists(self, name):
+        if self._query("SELECT 1 FROM names WHERE name = ?", name):
+            return True
+        # a directory exists as long as a name lives below it.
+        prefix = name.rstrip("/") + "/"
+        return bool(
+            self._query(
+                "SELECT 1 FROM names WHERE substr(name, 1, ?) = ? LIMIT 1", len(prefix), prefix
+            )
+        )
+
+    def size(self, name):
+        rows = self._query(
+            "SELECT size FROM names JOIN blobs USING (digest) WHERE name = ?", name
+        )
+        if not rows:
+            raise FileNotFoundError("No such file: {}".format(name))
+        return rows[0][0]
+
+    def modified_time(self, name):
+        rows = self._query("SELECT modified FROM names WHERE name = ?", name)
+        if not rows:
+            raise FileNotFoundError("No such file: {}".format(name))
+        return datetime.fromtimestamp(rows[0][0], timezone.utc)
+
+    def listdir(self, path):
+        prefix = path.strip("/")
+        if prefix:
+            prefix += "/"
+        rows = self._query(
+            "SELECT name FROM names WHERE substr(name, 1, ?) = ?", len(prefix), prefix
+        )
+        directories, files = set(), []
+        for (name,) in rows:
+            head, sep, _ = name[len(prefix):].partition("/")
+            if sep:
+                directories.add(head)
+            else:
+                files.append(head)
+        return sorted(directories), files
+
+    def path(self, name):
+        return self.backend.path(self._blob_name(self._digest(name)))
+
+    def url(self, name):
+        return self.backend.url(self._blob_name(self._digest(name)))
+
+    def stats(self):
+        """Return how much storage deduplication saves."""
+        with self._lock:
+            names, logical = self._db.execute(
+                "SELECT count(*), coalesce(sum(size), 0) FROM names JOIN blobs USING (digest)"
+            ).fetchone()
+            blobs, physical = self._db.execute(
+                "SELECT count(*), coalesce(sum(size), 0) FROM blobs"
+            ).fetchone()
+        return {
+            "names": names,
+            "blobs": blobs,
+            "logical_bytes": logical,
+            "stored_bytes": physical,
+            "uploads": self.uploads,
+            "deduplicated": self.deduplicated,
+        }
@@ -1,21 +1,245 @@
 import ftplib
 import io
 import os
-from datetime import datetime
+import posixpath
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
 from urllib.parse import urljoin, urlparse
 
-from ..utils import filepath_to_uri, DEFAULT_CHUNK_SIZE
+from ..utils import (
+    filepath_to_uri,
+    get_fileno,
+    chunk_size_for,
+    iter_chunks,
+    stream_size,
+    DEFAULT_CHUNK_SIZE,
+)
 from ..base import Storage
+from ..walk import Entry, join
+from ..pool import ConnectionPool
+
+
+def _is_broken(exc):
+    """
+    Return True if ``exc`` leaves the control connection in an unknown state.
+    Permanent (5xx) replies are ordinary failures and keep it usable.
+    """
+    while exc is not None:
+        if isinstance(exc, ftplib.error_perm):
+            return False
+        exc = exc.__context__
+    return True
+
+
+def _is_transient(exc):
+    """
+    Return True if ``exc`` was caused by a network or temporary server
+    error, which is worth retrying.
+    """
+    while exc is not None:
+        if isinstance(exc, ftplib.error_perm):
+            return False
+        if isinstance(exc, ftplib.all_errors):
+            return True
+        exc = exc.__context__
+    return False
+
+
+def _parse_mlsx(line):
+    """
+    Parse one MLST/MLSD entry, ``type=file;size=10;modify=...; name``, into
+    the file name and a dict of lower-cased facts.
+    """
+    facts, _, name = line.lstrip().partition(" ")
+    parsed = {}
+    for fact in facts.split(";"):
+        key, sep, value = fact.partition("=")
+        if sep:
+            parsed[key.lower()] = value
+    return name, parsed
+
+
+def _parse_time(value):
+    """Parse an MLSx ``modify`` fact or MDTM reply, always in UTC."""
+    value, _, fraction = value.partition(".")
+    mtime = datetime.strptime(value[:14], "%Y%m%d%H%M%S")
+    if fraction:
+        mtime = mtime.replace(microsecond=int(fraction[:6].ljust(6, "0")))
+    return mtime.replace(tzinfo=timezone.utc)
+
+
+class _DirectoryCache:
+    """A bounded LRU set of remote directories known to exist."""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._dirs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, path):
+        path = path.rstrip("/")
+        with self._lock:
+            if path not in self._dirs:
+                return False
+            self._dirs.move_to_end(path)
+            return True
+
+    def __len__(self):
+        return len(self._dirs)
+
+    def add(self, path):
+        """Remember ``path`` and, implicitly, all of its parents."""
+        parents = []
+        path = path.rstrip("/")
+        while path:
+            parents.append(path)
+            path = os.path.dirname(path).rstrip("/")
+
+        with self._lock:
+            for parent in reversed(parents):
+                self._dirs[parent] = None
+                self._dirs.move_to_end(parent)
+            while len(self._dirs) > self.max_size:
+                self._dirs.popitem(last=False)
+
+    def discard(self, path):
+        """Forget ``path`` and everything below it."""
+        path = path.rstrip("/")
+        prefix = path + "/"
+        with self._lock:
+            for key in [k for k in self._dirs if k == path or k.startswith(prefix)]:
+                del self._dirs[key]
+
+    def clear(self):
+        with self._lock:
+            self._dirs.clear()
+
+
+class _ListingCache:
+    """
+    Directory listings kept for ``ttl`` seconds, by their path from the
+    root, relative paths being relative to ``base``, the login path.
+    """
+
+    def __init__(self, ttl, base="/"):
+        self.ttl = ttl
+        self.base = base or "/"
+        self._listings = {}
+        self._lock = threading.Lock()
+
+    def _key(self, path):
+        # "", "." and "/" are all the root when logged in at "/".
+        return posixpath.normpath(posixpath.join(self.base, path or "."))
+
+    def get(self, path):
+        if not self.ttl:
+            return None
+        with self._lock:
+            cached = self._listings.get(self._key(path))
+        if cached is None or cached[0] < time.monotonic():
+            return None
+        return cached[1]
+
+    def set(self, path, listing):
+        if not self.ttl:
+            return
+        now = time.monotonic()
+        with self._lock:
+            for key in [k for k, v in self._listings.items() if v[0] < now]:
+                del self._listings[key]
+            self._listings[self._key(path)] = (now + self.ttl, listing)
+
+    def invalidate(self, name):
+        """Drop the listings of every directory above ``name``."""
+        if not self.ttl:
+            return
+        with self._lock:
+            path = self._key(name)
+            while True:
+                parent = posixpath.dirname(path)
+                self._listings.pop(parent, None)
+                # a deleted directory takes its own listing with it.
+                self._listings.pop(path, None)
+                if parent == path:
+                    break
+                path = parent
+
+    def clear(self):
+        with self._lock:
+            self._listings.clear()
 
 
 class FTPStorage(Storage):
-    def __init__(self, location, base_url=None, encoding=None):
+    """
+    FTP storage. Every thread checks out its own control connection from a
+    bounded pool, so concurrent requests never share a socket or cwd state.
+    """
+
+    bulk_coalesce_threshold = 16
+    # uploads are sent in chunks of up to this size, a few socket send
+    # buffers; more only delays the first bytes on the wire.
+    upload_chunk_size = 256 * 2 ** 10
+
+    def __init__(
+        self,
+        location,
+        base_url=None,
+        encoding=None,
+        pool_size=4,
+        pool_min_size=0,
+        pool_timeout=None,
+        idle_timeout=60,
+        max_lifetime=None,
+        ping_after=1,
+        dir_cache_size=1024,
+        listing_ttl=None,
+        segment_parallelism=1,
+        segment_size=8 * 2 ** 20,
+        segment_threshold=32 * 2 ** 20,
+        retries=3,
+        retry_backoff=0.5,
+    ):
         self.location = location
         self.base_url = base_url
         self.encoding = encoding or "utf-8"
+        self.segment_parallelism = segment_parallelism
+        self.segment_size = segment_size
+        self.segment_threshold = segment_threshold
+        self.retries = retries
+        self.retry_backoff = retry_backoff
 
         self._config = self._decode_location(location)
-        self._connection = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._round_trips = 0
+        self._dirs = _DirectoryCache(dir_cache_size)
+        self._features = None
+        self._listings = _ListingCache(listing_ttl, self._config["path"])
+        self._pool = ConnectionPool(
+            self._connect,
+            close=self._close_connection,
+            min_size=pool_min_size,
+            max_size=pool_size,
+            idle_timeout=idle_timeout,
+            max_lifetime=max_lifetime,
+            timeout=pool_timeout,
+            # the server may have closed a connection left idle.
+            ping=self._ping,
+            ping_after=ping_after,
+        )
+
+    @property
+    def _connection(self):
+        """The connection checked out by the current thread, if any."""
+        return getattr(self._local, "connection", None)
+
+    @_connection.setter
+    def _connection(self, connection):
+        self._local.connection = connection
 
     def _decode_location(self, location):
         """
@@ -39,134 +263,567 @@ class FTPStorage(Storage):
         config["host"] = splitted_url.hostname
         config["user"] = splitted_url.username
         config["password"] = splitted_url.password
-        config["port"] = int(splitted_url.port)
+        config["port"] = splitted_url.port or ftplib.FTP_PORT
 
         return config
 
+    def _count_round_trips(self, ftp):
+        """
+        Count the commands sent over ``ftp``'s control channel in its
+        ``round_trips`` attribute and remember the current transfer type.
+        """
+        ftp.round_trips = 0
+        ftp.transfer_type = None
+        putcmd = ftp.putcmd
+
+        def counting_putcmd(line):
+            ftp.round_trips += 1
+            self._local.round_trips = getattr(self._local, "round_trips", 0) + 1
+            with self._lock:
+                self._round_trips += 1
+            if line.startswith("TYPE "):
+                ftp.transfer_type = line[5:]
+            putcmd(line)
+
+        ftp.putcmd = counting_putcmd
+
+    def _connect(self):
+        ftp = ftplib.FTP()
+        ftp.encoding = self.encoding
+        self._count_round_trips(ftp)
+        # set while a file transfers over the connection a thread holds, and
+        # when the transfer broke it.
+        ftp.lent = False
+        ftp.broken = False
+
+        try:
+            ftp.connect(self._config["host"], self._config["port"])
+            ftp.login(self._config["user"], self._config["password"])
+            if self._config["active"]:
+                ftp.set_pasv(False)
+
+            if self._config["path"] != "":
+                ftp.cwd(self._config["path"])
+            return ftp
+        except ftplib.all_errors:
+            raise Exception(
+                "Connection or Login error using data {}".format(repr(self._config))
+            )
+
+    def _close_connection(self, ftp):
+        try:
+            ftp.quit()
+        except ftplib.all_errors:
+            ftp.close()
+
+    def _ping(self, ftp):
+        ftp.voidcmd("NOOP")
+
     def _start_connection(self):
-        # Check if the connection is still alive and if not, drop it
-        if self._connection is not None:
+        """
+        Check out a connection for the current thread. It is held until
+        ``_release_connection`` or ``disconnect`` is called.
+        """
+        if self._connection is None:
+            self._connection = self._pool.acquire()
+
+    def _release_connection(self, discard=False):
+        """Return the current thread's connection to the pool."""
+        connection = self._connection
+        if connection is None:
+            return
+        self._connection = None
+        with self._lock:
+            lent, connection.lent = connection.lent, False
+        if not lent:
+            self._return_connection(connection, discard=discard or connection.broken)
+        # otherwise the file transferring over it returns it when done.
+
+    def _return_connection(self, connection, discard=False):
+        if discard:
+            # the server may have gone away, forget what we know about it.
+            self._dirs.clear()
+        self._pool.release(connection, discard=discard)
+
+    def _hold_connection(self):
+        """
+        Keep the connection the current thread checks out on its next
+        operation for all the later ones, until ``_unhold_connection``.
+        """
+        self._local.hold = True
+
+    def _unhold_connection(self):
+        self._local.hold = False
+        self._release_connection()
+
+    def _lend_connection(self):
+        """
+        Return a connection for the transfers of a file: the one the current
+        thread holds when no other file uses it, otherwise one of its own.
+        """
+        if self._connection is None and getattr(self._local, "hold", False):
+            self._start_connection()
+        with self._lock:
+            connection = self._connection
+            if connection is not None and not (connection.lent or connection.broken):
+                connection.lent = True
+                return connection
+        return self._pool.acquire()
+
+    def _give_back(self, connection, discard=False):
+        """Return a connection from ``_lend_connection``."""
+        with self._lock:
+            lent, connection.lent = connection.lent, False
+            if lent and discard:
+                # its holder replaces it on its next operation.
+                connection.broken = True
+        if not lent:
+            self._return_connection(connection, discard=discard)
+
+    @contextmanager
+    def _connection_scope(self):
+        """
+        Use the current thread's connection for one operation. A connection
+        checked out here is returned to the pool afterwards, unless the
+        thread holds its connections, or discarded if the operation broke
+        it. While a file transfers over the held connection, another one is
+        checked out.
+        """
+        held = self._connection
+        if held is not None and held.broken:
+            self._release_connection(discard=True)
+            held = None
+        if held is not None and not held.lent:
             try:
-                self._connection.pwd()
-            except ftplib.all_errors:
-                self._connection = None
+                yield held
+            except BaseException as e:
+                # later operations of the holder check out a fresh one.
+                if _is_broken(e):
+                    self._release_connection(discard=True)
+                raise
+            return
 
-        # make connection
-        if self._connection is None:
-            ftp = ftplib.FTP()
-            ftp.encoding = self.encoding
+        keep = held is None and getattr(self._local, "hold", False)
+        self._connection = None
+        self._start_connection()
+        try:
+            yield self._connection
+        except BaseException as e:
+            if _is_broken(e) or not keep:
+                self._release_connection(discard=_is_broken(e))
+            raise
+        else:
+            if not keep:
+                self._release_connection()
+        finally:
+            if held is not None:
+                self._connection = held
 
+    def pool_stats(self):
+        """
+        Return connection pool statistics, along with the number of control
+        channel commands sent so far.
+        """
+        stats = self._pool.stats()
+        with self._lock:
+            stats["round_trips"] = self._round_trips
+        return stats
+
+    def thread_round_trips(self):
+        """Return how many commands the current thread has sent so far."""
+        return getattr(self._local, "round_trips", 0)
+
+    def _get_features(self, connection):
+        """Return the set of extensions the server advertises in FEAT."""
+        if self._features is None:
             try:
-                ftp.connect(self._config["host"], self._config["port"])
-                ftp.login(self._config["user"], self._config["password"])
-                if self._config["active"]:
-                    ftp.set_pasv(False)
-
-                if self._config["path"] != "":
-                    ftp.cwd(self._config["path"])
-                self._connection = ftp
-                return
-            except ftplib.all_errors:
-                raise Exception(
-                    "Connection or Login error using data {}".format(repr(self._config))
-                )
-
-    def _mkremdirs(self, path):
-        pwd = self._connection.pwd()
-        path_splitted = path.split(os.path.sep)
-        for path_part in path_splitted:
+                resp = connection.sendcmd("FEAT")
+            except ftplib.error_perm:
+                resp = ""
+            features = set()
+            # the first and last lines are the 211 status lines.
+            for line in resp.splitlines()[1:-1]:
+                words = line.split()
+                if words:
+                    features.add(words[0].upper())
+            self._features = features
+        return self._features
+
+    def _mlst(self, connection, name):
+        resp = connection.sendcmd("MLST " + name)
+        lines = resp.splitlines()
+        if len(lines) < 3:
+            raise ftplib.error_reply(resp)
+        return _parse_mlsx(lines[1])[1]
+
+    def _is_dir(self, connection, name):
+        pwd = connection.pwd()
+        try:
+            connection.cwd(name)
+        except ftplib.error_perm:
+            return False
+        connection.cwd(pwd)
+        return True
+
+    def _binary(self, connection):
+        if connection.transfer_type != "I":
+            connection.voidcmd("TYPE I")
+
+    def _mkremdirs(self, path, connection=None):
+        connection = connection or self._connection
+        path_splitted = path.split("/")
+
+        # only create the directories below the deepest one known to exist.
+        start = 0
+        for i in range(len(path_splitted), 0, -1):
+            if "/".join(path_splitted[:i]) in self._dirs:
+                start = i
+                break
+
+        for i in range(start + 1, len(path_splitted) + 1):
+            directory = "/".join(path_splitted[:i])
             try:
-                self._connection.cwd(path_part)
+                connection.mkd(directory)
+            except ftplib.error_perm:
+                # 550, the directory already exists.
+                pass
             except ftplib.all_errors:
-                try:
-                    self._connection.mkd(path_part)
-                    self._connection.cwd(path_part)
-                except ftplib.all_errors:
-                    raise Exception(f"Cannot create directory chain {path}")
-        self._connection.cwd(pwd)
+                raise Exception(f"Cannot create directory chain {path}")
+        self._dirs.add(path)
 
-    def _get_dir_details(self, path):
+    def _transfercmd(self, connection, cmd, name, rest=None):
+        """
+        Start a binary transfer on ``name``. Uploads that fail because the
+        parent directory is missing create it and retry once.
+        """
+        self._binary(connection)
+        directory = os.path.dirname(name)
+        upload = cmd in ("STOR", "APPE") and directory
         try:
-            lines = []
-            self._connection.retrlines("LIST " + path, lines.append)
-            dirs = {}
-            files = {}
-            for line in lines:
-                words = line.split()
-                if len(words) < 6:
-                    continue
+            conn = connection.transfercmd(cmd + " " + name, rest=rest)
+        except ftplib.error_perm:
+            if not upload:
+                raise
+            # the cached directory may have been removed behind our back.
+            self._dirs.discard(directory)
+            self._mkremdirs(directory, connection)
+            return connection.transfercmd(cmd + " " + name, rest=rest)
 
-                if words[-2] == "->":
-                    continue
+        if upload:
+            self._dirs.add(directory)
+        return conn
 
-                if words[0][0] == "d":
-                    dirs[words[-1]] = 0
-                elif words[0][0] == "-":
-                    files[words[-1]] = int(words[-5])
+    def _get_dir_details(self, path):
+        """
+        Return two dicts, directories and files, mapping each name to its
+        ``(size, modified_time)``. The listing is cached when ``listing_ttl``
+        is set.
+        """
+        cached = self._listings.get(path)
+        if cached is not None:
+            return cached
 
-            return dirs, files
+        try:
+            lines = []
+            features = self._get_features(self._connection)
+            # RFC 3659 advertises MLSD under the MLST feature.
+            if "MLSD" in features or "MLST" in features:
+                self._connection.retrlines("MLSD " + path, lines.append)
+                listing = self._parse_mlsd(lines)
+            else:
+                self._connection.retrlines("LIST " + path, lines.append)
+                listing = self._parse_list(lines)
         except ftplib.all_errors:
             raise Exception("Error getting listing for {}".format(path))
 
-    def _put_file(self, name, stream):
+        self._listings.set(path, listing)
+        return listing
+
+    def _parse_mlsd(self, lines):
+        dirs = {}
+        files = {}
+        for line in lines:
+            name, facts = _parse_mlsx(line)
+            modified = facts.get("modify")
+            if modified:
+                modified = _parse_time(modified)
+            entry_type = facts.get("type", "").lower()
+            if entry_type == "dir":
+                dirs[name] = (0, modified)
+            elif entry_type == "file":
+                files[name] = (int(facts.get("size", 0)), modified)
+        return dirs, files
+
+    def _parse_list(self, lines):
+        dirs = {}
+        files = {}
+        for line in lines:
+            # permissions, links, owner, group, size, month, day, time, name
+            words = line.split(None, 8)
+            if len(words) < 9:
+                continue
+
+            if words[0][0] == "d":
+                dirs[words[8]] = (0, None)
+            elif words[0][0] == "-":
+                files[words[8]] = (int(words[4]), None)
+        return dirs, files
 
+    def _backoff(self, attempt):
+        time.sleep(self.retry_backoff * 2 ** attempt)
+
+    def _retry(self, transfer, retries=None):
+        """
+        Call ``transfer(resume)`` on the current thread's connection. After
+        a transient failure the connection is replaced and ``transfer`` is
+        called again with ``resume=True``, up to ``retries`` times (the
+        storage's by default).
+        """
+        if retries is None:
+            retries = self.retries
+        attempt = 0
+        while True:
+            try:
+                if attempt:
+                    self._release_connection(discard=True)
+                    self._start_connection()
+                return transfer(attempt > 0)
+            except Exception as e:
+                if attempt >= retries or not _is_transient(e):
+                    raise
+            self._backoff(attempt)
+            attempt += 1
+
+    def _remote_size(self, name):
+        """Return the size of ``name`` on the server, 0 if it does not exist."""
+        self._binary(self._connection)
         try:
-            self._mkremdirs(os.path.dirname(name))
-            pwd = self._connection.pwd()
-            self._connection.cwd(os.path.dirname(name))
-            self._connection.storbinary(
-                "STOR " + os.path.basename(name), stream, DEFAULT_CHUNK_SIZE
-            )
-            self._connection.cwd(pwd)
-        except ftplib.all_errors:
-            raise Exception("Error writing file {}".format(name))
+            return self._connection.size(name) or 0
+        except ftplib.error_perm:
+            return 0
+
+    def _put_file(self, name, stream):
+        chunk_size = chunk_size_for(stream, maximum=self.upload_chunk_size)
+        seekable = getattr(stream, "seekable", lambda: False)()
+        size = stream_size(stream) if seekable else None
+        # whether the server truncated the file for this upload already.
+        started = False
+
+        def store(resume):
+            nonlocal started
+            offset = 0
+            if resume and started:
+                # only the tail the server did not receive is sent again.
+                offset = self._remote_size(name)
+                if size is None or offset > size:
+                    offset = 0
+            if seekable:
+                stream.seek(offset)
+            command = "APPE" if offset else "STOR"
+            with self._transfercmd(self._connection, command, name) as conn:
+                started = True
+                for chunk in iter_chunks(stream, chunk_size, reuse_buffer=True):
+                    conn.sendall(chunk)
+            self._connection.voidresp()
 
-    def _read(self, name):
-        memory_file = io.BytesIO()
         try:
-            pwd = self._connection.pwd()
-            self._connection.cwd(os.path.dirname(name))
-            self._connection.retrybinary(
-                "RETR " + os.path.basename(name), memory_file.write
-            )
-            self._connection.cwd(pwd)
-            memory_file.seek(0)
-            return memory_file
+            # what a stream that can't seek gave away can't be sent again.
+            self._retry(store, retries=None if seekable else 0)
         except ftplib.all_errors:
-            raise Exception(f"Error reading file {name}")
+            raise Exception("Error writing file {}".format(name))
+        finally:
+            self._listings.invalidate(name)
 
-    def open(self, name, mode="rb"):
-        remote_file = FTPStorageFile(name, self, mode=mode)
+    def open(self, name, mode="rb", chunk_size=DEFAULT_CHUNK_SIZE):
+        remote_file = FTPStorageFile(name, self, mode=mode, chunk_size=chunk_size)
         return remote_file
 
+    def _segments(self, name, parallelism, segment_size, threshold):
+        """
+        Split ``name`` into ``(start, length)`` byte ranges, or return None
+        when it should be downloaded as a single stream.
+        """
+        if parallelism <= 1:
+            return None
+        size = self.size(name)
+        if size < threshold:
+            return None
+        return [
+            (start, min(segment_size, size - start))
+            for start in range(0, size, segment_size)
+        ]
+
+    def _read_segment(self, name, start, length, write):
+        """Pass ``length`` bytes of ``name`` from ``start`` to ``write``."""
+        with self.open(name) as remote_file:
+            remote_file.seek(start)
+            end = start + length
+            while start < end:
+                data = remote_file.read(min(end - start, remote_file.chunk_size))
+                if not data:
+                    raise Exception("Error reading file {}".format(name))
+                write(start, data)
+                start += len(data)
+
+    def _fetch_segment(self, name, start, length):
+        segment = bytearray()
+        self._read_segment(name, start, length, lambda offset, data: segment.extend(data))
+        return bytes(segment)
+
+    def _iter_segments(self, name, segments, parallelism):
+        """
+        Yield the segments in order while up to ``parallelism`` of them are
+        fetched ahead, each over its own connection.
+        """
+        segments = iter(segments)
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=parallelism) as executor:
+            try:
+                for start, length in segments:
+                    pending.append(executor.submit(self._fetch_segment, name, start, length))
+                    if len(pending) >= parallelism:
+                        yield pending.popleft().result()
+                while pending:
+                    yield pending.popleft().result()
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def iter_download(self, name, parallelism=None, segment_size=None, threshold=None):
+        """
+        Yield the content of ``name`` in order. Files of at least
+        ``threshold`` bytes are fetched as ``segment_size`` byte ranges over
+        ``parallelism`` connections; the defaults come from the storage.
+        """
+        parallelism = parallelism or self.segment_parallelism
+        segments = self._segments(
+            name,
+            parallelism,
+            segment_size or self.segment_size,
+            threshold if threshold is not None else self.segment_threshold,
+        )
+        if segments is None:
+            with self.open(name) as remote_file:
+                yield from remote_file
+        else:
+            yield from self._iter_segments(name, segments, parallelism)
+
+    def download(self, name, f, parallelism=None, segment_size=None, threshold=None):
+        """
+        Download ``name`` into the local file object ``f``. Segments of a
+        large file are written in place as they arrive when ``f`` has a file
+        descriptor, otherwise in order.
+        """
+        parallelism = parallelism or self.segment_parallelism
+        segments = self._segments(
+            name,
+            parallelism,
+            segment_size or self.segment_size,
+            threshold if threshold is not None else self.segment_threshold,
+        )
+        fd = get_fileno(f)
+        if segments is None or fd is None or not hasattr(os, "pwrite"):
+            if segments is None:
+                chunks = self.iter_download(name, parallelism=1)
+            else:
+                chunks = self._iter_segments(name, segments, parallelism)
+            for chunk in chunks:
+                f.write(chunk)
+            return
+
+        f.flush()
+        base = f.tell()
+
+        def write(offset, data):
+            view = memoryview(data)
+            while view:
+                written = os.pwrite(fd, view, base + offset)
+                view = view[written:]
+                offset += written
+
+        with ThreadPoolExecutor(max_workers=parallelism) as executor:
+            futures = [
+                executor.submit(self._read_segment, name, start, length, write)
+                for start, length in segments
+            ]
+            try:
+                for future in futures:
+                    future.result()
+            finally:
+                for future in futures:
+                    future.cancel()
+        start, length = segments[-1]
+        f.seek(base + start + length)
+
     def disconnect(self):
-        self._connection.quit()
-        self._connection = None
+        """Close the current thread's connection and all idle ones."""
+        self._release_connection(discard=True)
+        self._pool.clear()
 
     def save(self, name, stream):
-        self._start_connection()
-        self._put_file(name, stream)
+        with self._connection_scope():
+            self._put_file(name, stream)
         stream.close()
         return name
 
     def listdir(self, path):
-        self._start_connection()
-
-        dirs, files = self._get_dir_details(path)
+        with self._connection_scope():
+            dirs, files = self._get_dir_details(path)
         return list(dirs.keys()), list(files.keys())
 
+    def scandir(self, path):
+        # one MLSD (or LIST) brings the names with their size and date.
+        with self._connection_scope():
+            dirs, files = self._get_dir_details(path)
+        for name, (_, modified) in dirs.items():
+            yield Entry(join(path, name), None, modified, True)
+        for name, (size, modified) in files.items():
+            yield Entry(join(path, name), size, modified, False)
+
     def delete(self, name):
-        if not self.exists(name):
-            return
+        with self._connection_scope():
+            try:
+                self._connection.delete(name)
+            except ftplib.error_perm:
+                # 550 is the usual answer for a missing file, only fail if
+                # the file is still there.
+                if self._exists(name):
+                    raise Exception("Error when removing {}".format(name))
+            except ftplib.all_errors:
+                raise Exception("Error when removing {}".format(name))
+            self._dirs.discard(name)
+            self._listings.invalidate(name)
 
-        self._start_connection()
+    def exists(self, name):
+        with self._connection_scope():
+            return self._exists(name)
+
+    def _exists(self, name):
+        """
+        Probe a single file with MLST, or SIZE when MLST is not supported,
+        falling back to a listing of the parent directory.
+        """
+        connection = self._connection
         try:
-            self._connection.delete(name)
+            features = self._get_features(connection)
+            if "MLST" in features:
+                try:
+                    self._mlst(connection, name)
+                    return True
+                except ftplib.error_perm:
+                    return False
+
+            if "SIZE" in features:
+                try:
+                    self._binary(connection)
+                    connection.size(name)
+                    return True
+                except ftplib.error_perm:
+                    # SIZE does not work on directories.
+                    return self._is_dir(connection, name)
         except ftplib.all_errors:
-            raise Exception("Error when removing {}".format(name))
+            raise Exception("Error when testing existence of {}".format(name))
 
-    def exists(self, name):
-        self._start_connection()
         try:
             nlst = self._connection.nlst(os.path.dirname(name) + "/")
             if name in nlst or os.path.basename(name) in nlst:
@@ -184,6 +841,25 @@ class FTPStorage(Storage):
         except ftplib.all_errors:
             raise Exception("Error when testing existence of {}".format(name))
 
+    def size(self, name):
+        with self._connection_scope() as connection:
+            try:
+                if "MLST" in self._get_features(connection):
+                    return int(self._mlst(connection, name)["size"])
+                self._binary(connection)
+                return connection.size(name)
+            except (ftplib.all_errors + (KeyError,)):
+                raise Exception("Error getting size of {}".format(name))
+
+    def modified_time(self, name):
+        with self._connection_scope() as connection:
+            try:
+                if "MLST" in self._get_features(connection):
+                    return _parse_time(self._mlst(connection, name)["modify"])
+                return _parse_time(connection.voidcmd("MDTM " + name)[4:].strip())
+            except (ftplib.all_errors + (KeyError, ValueError)):
+                raise Exception("Error getting modified time of {}".format(name))
+
     def url(self, name):
         if self.base_url is None:
             raise ValueError("This file is not accessible via a URL.")
@@ -196,26 +872,262 @@ class FTPStorage(Storage):
 
 
 class FTPStorageFile:
-    def __init__(self, name, storage, mode):
+    """
+    A file on the FTP server.
+
+    Reads stream from the data connection as the caller consumes them, so
+    memory use is bounded by the chunk size. ``seek`` restarts the transfer
+    at the new offset with ``REST``. Iterating over the file yields chunks,
+    which makes it usable as a Flask streaming response body.
+
+    In write ("wb") or append ("ab") mode the first ``write`` opens a STOR
+    (or APPE) transfer and data is pushed as it arrives; ``close`` finishes
+    the upload.
+    """
+
+    def __init__(self, name, storage, mode, chunk_size=DEFAULT_CHUNK_SIZE):
         self.name = name
         self.storage = storage
         self.mode = mode
-        self.file = io.BytesIO()
-        self._is_read = False
+        self.chunk_size = chunk_size
+        self.closed = False
+
+        self._ftp = None
+        self._sock = None
+        self._pos = 0
+        self._eof = False
+        self._size = None
+        self._buffer = bytearray()
+        self._aborted = False
+
+    def __del__(self):
+        # like io files, a file dropped without being closed is closed, so
+        # its connection goes back to the pool.
+        try:
+            self.close()
+        except Exception:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None and self._writing:
+            self._abort_upload()
+        self.close()
+
+    @property
+    def _writing(self):
+        return "w" in self.mode or "a" in self.mode
+
+    def __iter__(self):
+        return self.chunks()
+
+    def _acquire(self):
+        if self.closed:
+            raise ValueError("I/O operation on closed file.")
+        if self._ftp is None:
+            # a transfer in progress blocks every other command on its
+            # connection, the thread's one is only used while free.
+            self._ftp = self.storage._lend_connection()
+
+    def _release(self, discard=False):
+        ftp, self._ftp = self._ftp, None
+        if ftp is not None:
+            self.storage._give_back(ftp, discard=discard)
+
+    def _open_transfer(self):
+        self._acquire()
+        try:
+            self._sock = self.storage._transfercmd(
+                self._ftp, "RETR", self.name, rest=self._pos or None
+            )
+        except ftplib.all_errors as e:
+            self._release(discard=_is_broken(e))
+            raise Exception("Error reading file {}".format(self.name))
+
+    def _end_transfer(self):
+        sock, self._sock = self._sock, None
+        if sock is None:
+            return
+
+        action = "writing" if self._writing else "reading"
+        sock.close()
+        try:
+            self._ftp.voidresp()
+        except (ftplib.error_temp, ftplib.error_perm):
+            # 426 or 451, the transfer was aborted before its end.
+            if self._eof:
+                raise Exception("Error {} file {}".format(action, self.name))
+        except ftplib.all_errors:
+            self._release(discard=True)
+            raise Exception("Error {} file {}".format(action, self.name))
+        if self._eof and not self._writing:
+            # read to the end, the connection is not needed until a seek.
+            self._release()
+
+    def _recv(self, size):
+        if self._eof:
+            return b""
+
+        attempt = 0
+        while True:
+            try:
+                if self._sock is None:
+                    self._open_transfer()
+                data = self._sock.recv(size)
+                break
+            except Exception as e:
+                if self._sock is not None:
+                    self._sock.close()
+                    self._sock = None
+                    self._release(discard=True)
+                if attempt >= self.storage.retries or not _is_transient(e):
+                    raise Exception("Error reading file {}".format(self.name))
+            # the transfer restarts where it stopped, with REST.
+            self.storage._backoff(attempt)
+            attempt += 1
+
+        if not data:
+            self._eof = True
+            self._end_transfer()
+        self._pos += len(data)
+        return data
 
     def read(self, num_bytes=None):
-        if not self._is_read:
-            self.storage._start_connection()
-            self.file = self.storage._read(self.name)
-            self._is_read = True
+        if self._writing:
+            raise AttributeError("File was opened for write-only access.")
+
+        if num_bytes is None or num_bytes < 0:
+            return b"".join(self.chunks())
+
+        chunks = []
+        while num_bytes > 0:
+            data = self._recv(min(num_bytes, self.chunk_size))
+            if not data:
+                break
+            chunks.append(data)
+            num_bytes -= len(data)
+        return b"".join(chunks)
+
+    def chunks(self, chunk_size=None):
+        """Yield the rest of the file in chunks of at most ``chunk_size``."""
+        chunk_size = chunk_size or self.chunk_size
+        while True:
+            data = self._recv(chunk_size)
+            if not data:
+                break
+            yield data
+
+    def size(self):
+        if self._size is None:
+            self._end_transfer()
+            self._acquire()
+            try:
+                self.storage._binary(self._ftp)
+                self._size = self._ftp.size(self.name)
+            except ftplib.all_errors as e:
+                self._release(discard=_is_broken(e))
+                raise Exception("Error getting size of {}".format(self.name))
+            self._release()
+        return self._size
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if self._writing:
+            raise io.UnsupportedOperation("seek")
+
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._pos + offset
+        elif whence == io.SEEK_END:
+            position = self.size() + offset
+        else:
+            raise ValueError("Invalid whence ({}).".format(whence))
+
+        if position < 0:
+            raise ValueError("Negative seek position {}.".format(position))
+
+        if position != self._pos:
+            self._end_transfer()
+            self._pos = position
+            self._eof = False
+        return self._pos
+
+    def tell(self):
+        return self._pos + len(self._buffer)
 
-        return self.file.read(num_bytes)
+    def readable(self):
+        return not self._writing
 
-    def write(self, stream):
-        if "w" not in self.mode:
+    def seekable(self):
+        return not self._writing
+
+    def writable(self):
+        return self._writing
+
+    def _open_upload(self):
+        self._acquire()
+        command = "APPE" if "a" in self.mode else "STOR"
+        try:
+            self._sock = self.storage._transfercmd(self._ftp, command, self.name)
+        except ftplib.all_errors as e:
+            self._release(discard=_is_broken(e))
+            raise Exception("Error writing file {}".format(self.name))
+
+    def _send(self, data):
+        if self._sock is None:
+            self._open_upload()
+        try:
+            self._sock.sendall(data)
+        except OSError:
+            self._sock.close()
+            self._sock = None
+            self._release(discard=True)
+            raise Exception("Error writing file {}".format(self.name))
+        self._pos += len(data)
+
+    def write(self, data):
+        if not self._writing:
             raise AttributeError("File was opend for read-only access.")
-        self.file = io.BytesIO(stream)
-        self._is_read = True
+
+        self._buffer += data
+        if len(self._buffer) >= self.chunk_size:
+            self.flush()
+        return len(data)
+
+    def flush(self):
+        if self._buffer:
+            self._send(self._buffer)
+            self._buffer = bytearray()
+
+    def _abort_upload(self):
+        """Drop a failed upload instead of leaving a truncated file behind."""
+        self._buffer = bytearray()
+        self._aborted = True
+        if self._sock is None:
+            return
+        self._sock.close()
+        self._sock = None
+        try:
+            self._ftp.getresp()
+            self._ftp.delete(self.name)
+        except ftplib.all_errors as e:
+            self._release(discard=_is_broken(e))
 
     def close(self):
-        self.file.close()
+        if self.closed:
+            return
+        try:
+            if self._writing:
+                self.flush()
+                if not (self._sock or self._pos or self._aborted) and "w" in self.mode:
+                    # nothing was written, still create an empty file.
+                    self._open_upload()
+                self._eof = True
+            self._end_transfer()
+        finally:
+            if self._writing:
+                self.storage._listings.invalidate(self.name)
+            self._release()
+            self.closed = True
@@ -0,0 +1,204 @@
+import time
+
+from ..base import Storage
+from ..utils import stream_size
+from ..metrics import OperationEvent
+
+
+class _Probe:
+    """Time one call of ``storage``'s backend and count its round trips."""
+
+    __slots__ = ("storage", "start", "round_trips")
+
+    def __init__(self, storage):
+        self.storage = storage
+        self.start = time.perf_counter()
+        self.round_trips = storage._round_trips()
+
+    def emit(self, operation, name, nbytes=None, error=None):
+        duration = time.perf_counter() - self.start
+        round_trips = self.storage._round_trips()
+        if round_trips is not None:
+            round_trips -= self.round_trips
+        self.storage._emit(
+            OperationEvent(
+                self.storage.backend_name, operation, name, duration, nbytes, round_trips, error
+            )
+        )
+
+
+class InstrumentedFile:
+    """
+    File returned by ``InstrumentedStorage.open``. The time spent in reads
+    or writes and the bytes moved are reported as one "read" or "write"
+    event when the file is closed.
+    """
+
+    def __init__(self, file, storage, name, mode):
+        self.file = file
+        self.storage = storage
+        self.name = name
+        self.operation = "read" if "r" in mode and "+" not in mode else "write"
+        self.bytes = 0
+        self.duration = 0.0
+        self.round_trips = 0
+        self.error = None
+        self.closed = False
+
+    def __getattr__(self, name):
+        return getattr(self.file, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            self.file.__exit__(exc_type, exc_value, traceback)
+        finally:
+            self._report()
+
+    def __iter__(self):
+        iterator = iter(self.file)
+        while True:
+            try:
+                chunk = self._call(next, iterator)
+            except StopIteration:
+                return
+            self.bytes += len(chunk)
+            yield chunk
+
+    def _call(self, func, *args):
+        start = time.perf_counter()
+        round_trips = self.storage._round_trips()
+        try:
+            return func(*args)
+        except StopIteration:
+            raise
+        except Exception as e:
+            self.error = e
+            raise
+        finally:
+            self.duration += time.perf_counter() - start
+            if round_trips is not None:
+                self.round_trips += self.storage._round_trips() - round_trips
+
+    def read(self, size=-1):
+        data = self._call(self.file.read, size)
+        self.bytes += len(data)
+        return data
+
+    def readinto(self, buffer):
+        count = self._call(self.file.readinto, buffer)
+        self.bytes += count or 0
+        return count
+
+    def write(self, data):
+        count = self._call(self.file.write, data)
+        self.bytes += len(data)
+        return count
+
+    def _report(self):
+        if self.closed:
+            return
+        self.closed = True
+        round_trips = None if self.storage._round_trips() is None else self.round_trips
+        self.storage._emit(
+            OperationEvent(
+                self.storage.backend_name,
+                self.operation,
+                self.name,
+                self.duration,
+                self.bytes,
+                round_trips,
+                self.error,
+            )
+        )
+
+    def close(self):
+        try:
+            self.file.close()
+        finally:
+            self._report()
+
+
+class InstrumentedStorage(Storage):
+    """
+    Report every operation on ``backend`` to ``listeners``.
+
+    Each listener is called with an OperationEvent after save, open,
+    exists, size, modified_time, listdir, scandir (once per directory of a
+    walk) and delete, whether they succeed
+    or raise; files report their reads or writes when closed. Round trips
+    are counted for backends with a ``thread_round_trips`` method
+    (FTPStorage). Listeners run on the calling thread, so they should be
+    cheap: a Metrics instance is.
+    """
+
+    def __init__(self, backend, listeners=()):
+        self.backend = backend
+        self.backend_name = type(backend).__name__
+        self.listeners = list(listeners)
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        self.listeners.remove(listener)
+
+    def _round_trips(self):
+        counter = getattr(self.backend, "thread_round_trips", None)
+        return None if counter is None else counter()
+
+    def _emit(self, event):
+        for listener in self.listeners:
+            listener(event)
+
+    def _call(self, operation, name, func, *args):
+        probe = _Probe(self)
+        try:
+            result = func(name, *args)
+        except Exception as e:
+            probe.emit(operation, name, error=e)
+            raise
+        probe.emit(operation, name)
+        return result
+
+    def save(self, name, content):
+        # saves rewind seekable streams, so the whole stream is stored.
+        nbytes = stream_size(getattr(content, "stream", content))
+        probe = _Probe(self)
+        try:
+            name = self.backend.save(name, content)
+        except Exception as e:
+            probe.emit("save", name, error=e)
+            raise
+        probe.emit("save", name, nbytes)
+        return name
+
+    def open(self, name, mode="rb"):
+        f = self._call("open", name, self.backend.open, mode)
+        return InstrumentedFile(f, self, name, mode)
+
+    def delete(self, name):
+        return self._call("delete", name, self.backend.delete)
+
+    def exists(self, name):
+        return self._call("exists", name, self.backend.exists)
+
+    def size(self, name):
+        return self._call("size", name, self.backend.size)
+
+    def modified_time(self, name):
+        return self._call("modified_time", name, self.backend.modified_time)
+
+    def listdir(self, path):
+        return self._call("listdir", path, self.backend.listdir)
+
+    def scandir(self, path):
+        return iter(self._call("scandir", path, lambda path: list(self.backend.scandir(path))))
+
+    def path(self, name):
+        return self.backend.path(name)
+
+    def url(self, name):
+        return self.backend.url(name)
@@ -0,0 +1,194 @@
+import io
+import posixpath
+import threading
+from collections import Counter, OrderedDict
+from datetime import datetime, timezone
+from urllib.parse import urljoin
+
+from ..base import Storage
+from ..utils import filepath_to_uri, create_chunks
+from ..walk import Entry
+
+
+def _normalize(name):
+    name = posixpath.normpath(name.strip("/"))
+    return "" if name == "." else name
+
+
+def _parents(name):
+    """Yield the directories holding ``name``, nearest first, up to the root."""
+    while name:
+        name = posixpath.dirname(name)
+        yield name
+
+
+class MemoryFile(io.BytesIO):
+    """A file opened for writing, stored into its MemoryStorage on close."""
+
+    def __init__(self, storage, name, initial=b""):
+        super().__init__(initial)
+        self.seek(0, io.SEEK_END)
+        self.storage = storage
+        self.name = name
+
+    def close(self):
+        if not self.closed:
+            self.storage._store(self.name, self.getvalue())
+        super().close()
+
+
+class MemoryStorage(Storage):
+    """
+    Keep files in memory, e.g. as a test double or as a fast tier for small
+    objects that are read often.
+
+    When ``max_bytes`` is set, the least recently read or written files are
+    evicted to stay within it. Directories exist as long as they hold a
+    file, like prefixes in an object store.
+    """
+
+    def __init__(self, base_url=None, max_bytes=None):
+        self.base_url = base_url
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        # name -> (content, modified time), least recently used first.
+        self._files = OrderedDict()
+        # directory -> number of files below it.
+        self._dirs = Counter()
+        self._size = 0
+
+        self.evictions = 0
+
+    def _remove(self, name):
+        """Forget ``name``, the lock must be held."""
+        data, _ = self._files.pop(name)
+        self._size -= len(data)
+        for parent in _parents(name):
+            self._dirs[parent] -= 1
+            if not self._dirs[parent]:
+                del self._dirs[parent]
+
+    def _store(self, name, data):
+        name = _normalize(name)
+        if not name:
+            raise ValueError("A file needs a name.")
+        if self.max_bytes is not None and len(data) > self.max_bytes:
+            raise ValueError(
+                "{} is larger than the storage budget of {} bytes.".format(name, self.max_bytes)
+            )
+
+        with self._lock:
+            if name in self._dirs:
+                raise IOError("{} exists and is a directory.".format(name))
+            for parent in _parents(name):
+                if parent in self._files:
+                    raise IOError("{} exists and is not a directory.".format(parent))
+
+            if name in self._files:
+                self._remove(name)
+            self._files[name] = (data, datetime.now(timezone.utc))
+            self._size += len(data)
+            for parent in _parents(name):
+                self._dirs[parent] += 1
+
+            if self.max_bytes is not None:
+                while self._size > self.max_bytes:
+                    self._remove(next(iter(self._files)))
+                    self.evictions += 1
+        return name
+
+    def _get(self, name):
+        key = _normalize(name)
+        with self._lock:
+            try:
+                data, modified = self._files[key]
+            except KeyError:
+                raise FileNotFoundError("No such file: {}".format(name))
+            self._files.move_to_end(key)
+        return data, modified
+
+    def save(self, name, content):
+        stream = getattr(content, "stream", content)
+        if isinstance(stream, (bytes, bytearray, memoryview)):
+            data = bytes(stream)
+        else:
+            chunks = [
+                chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+                for chunk in create_chunks(stream)
+            ]
+            data = b"".join(chunks)
+        self._store(name, data)
+        return name
+
+    def open(self, name, mode="rb"):
+        if mode in ("r", "rb"):
+            f = io.BytesIO(self._get(name)[0])
+        elif mode in ("w", "wb"):
+            f = MemoryFile(self, name)
+        elif mode in ("a", "ab"):
+            try:
+                initial = self._get(name)[0]
+            except FileNotFoundError:
+                initial = b""
+            f = MemoryFile(self, name, initial)
+        else:
+            raise ValueError("MemoryStorage can't open files with mode {!r}.".format(mode))
+
+        if "b" not in mode:
+            return io.TextIOWrapper(f, encoding="utf-8")
+        return f
+
+    def delete(self, name):
+        with self._lock:
+            name = _normalize(name)
+            if name in self._files:
+                self._remove(name)
+
+    def exists(self, name):
+        name = _normalize(name)
+        with self._lock:
+            return not name or name in self._files or name in self._dirs
+
+    def size(self, name):
+        return len(self._get(name)[0])
+
+    def modified_time(self, name):
+        return self._get(name)[1]
+
+    def listdir(self, path):
+        directories, files = [], []
+        for entry in self.scandir(path):
+            (directories if entry.is_dir else files).append(posixpath.basename(entry.name))
+        return directories, files
+
+    def scandir(self, path):
+        path = _normalize(path)
+        prefix = path + "/" if path else ""
+        with self._lock:
+            directories = sorted(
+                name for name in self._dirs if name and posixpath.dirname(name) == path
+            )
+            files = sorted(
+                (name, len(data), modified)
+                for name, (data, modified) in self._files.items()
+                if name.startswith(prefix) and "/" not in name[len(prefix):]
+            )
+        entries = [Entry(name, None, None, True) for name in directories]
+        entries.extend(Entry(name, size, modified, False) for name, size, modified in files)
+        return entries
+
+    def url(self, name):
+        if self.base_url is None:
+            raise ValueError("This file is not accessible via a URL.")
+        return urljoin(self.base_url, filepath_to_uri(name).lstrip("/"))
+
+    def stats(self):
+        """Return the number of files, their size and the evictions so far."""
+        with self._lock:
+            return {
+                "entries": len(self._files),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+            }
@@ -1,24 +1,47 @@
+import mmap
 import os
-from io import BytesIO, StringIO
-from datetime import datetime
+import secrets
+from datetime import datetime, timezone
 from urllib.parse import urljoin
-from shutil import copyfileobj
 
-try:
-    from tempfile import SpooledTemporaryFile
-except ImportError:
-    from tempfile import TemporaryFile
 
+from .utils import filepath_to_uri, create_chunks, copy_stream, is_text_stream
+from .sync import GroupSync, fsync_directory
+from .serving import safe_name, serve, serve_offloaded
+from .bulk import exists_many, run_bulk
+from .walk import Entry, join, walk
+from .sharding import is_shard, shard_name
 
-from .utils import filepath_to_uri, create_chunks
+# suffix of the temporary files atomic saves write to.
+TEMP_SUFFIX = ".lagerung-tmp"
+
+DURABILITY_NONE = "none"
+DURABILITY_FILE = "file"
+DURABILITY_DIRECTORY = "directory"
+DURABILITY_BATCH = "batch"
+DURABILITY_POLICIES = (
+    DURABILITY_NONE,
+    DURABILITY_FILE,
+    DURABILITY_DIRECTORY,
+    DURABILITY_BATCH,
+)
 
 
 class Storage:
     """
     A base storage class, providing some default methods all other storage
     systems can inherit or override.
+
+    Every method has an ``a``-prefixed coroutine counterpart for async
+    views, running the blocking call in a pool of ``async_workers`` threads.
     """
 
+    async_workers = 32
+
+    # bulk existence checks list a directory instead of probing each name
+    # once this many names share it, None never lists.
+    bulk_coalesce_threshold = None
+
     def open(self, name):
         """Open the specified file from storage."""
         raise NotImplementedError("subclasses of Storage must provide a open() method")
@@ -43,6 +66,16 @@ class Storage:
             "subclasses of Storage must provide a exists() method"
         )
 
+    def size(self, name):
+        """Return the total size, in bytes, of the file specified by name."""
+        raise NotImplementedError("subclasses of Storage must provide a size() method")
+
+    def modified_time(self, name):
+        """Return the last modified time (as an aware UTC datetime) of the file."""
+        raise NotImplementedError(
+            "subclasses of Storage must provide a modified_time() method"
+        )
+
     def listdir(self, path):
         """List the contents of the specified path."""
         raise NotImplementedError(
@@ -53,83 +86,369 @@ class Storage:
         """Return an absolute URL where the file can be accessed by a client."""
         pass
 
+    def scandir(self, path):
+        """
+        Yield an Entry for each file and directory directly in ``path``.
+        Backends able to list metadata with the names override this, the
+        default asks for the size and modification time of every file.
+        """
+        directories, files = self.listdir(path)
+        for directory in directories:
+            yield Entry(join(path, directory), None, None, True)
+        for filename in files:
+            name = join(path, filename)
+            metadata = []
+            for method in (self.size, self.modified_time):
+                try:
+                    metadata.append(method(name))
+                except NotImplementedError:
+                    metadata.append(None)
+            yield Entry(name, metadata[0], metadata[1], False)
+
+    def walk(self, path="", page_size=None, cursor=None):
+        """
+        Lazily yield an Entry for everything below ``path``, depth first.
+        At most ``page_size`` entries are yielded; pass the name of the
+        last one as ``cursor`` to resume after it.
+        """
+        return walk(self, path, page_size, cursor)
+
+    def iter_files(self, prefix="", page_size=None, cursor=None):
+        """Like ``walk``, but only yield the files."""
+        return walk(self, prefix, page_size, cursor, files_only=True)
+
+    def serve(self, name, **kwargs):
+        """
+        Return a Flask response streaming the file, with support for Range
+        and conditional requests. Names leaving the storage, with ``..`` or
+        absolute, are answered with 404.
+        """
+        return serve(self, safe_name(name), **kwargs)
+
+    def save_many(self, items, concurrency=8):
+        """
+        Save many ``(name, content)`` pairs on up to ``concurrency`` threads.
+        Return a BulkResult per item, in order.
+        """
+        return run_bulk(
+            self.save, [(name, (name, content)) for name, content in items], concurrency
+        )
+
+    def delete_many(self, names, concurrency=8):
+        """Delete many files, returning a BulkResult per name, in order."""
+        return run_bulk(self.delete, [(name, (name,)) for name in names], concurrency)
+
+    def exists_many(self, names, concurrency=8):
+        """Check many files, returning a BulkResult per name, in order."""
+        return exists_many(self, names, concurrency, self.bulk_coalesce_threshold)
+
+    async def _run(self, func, *args):
+        # asyncio is only imported by the applications using it.
+        from .aio import run
+
+        return await run(self, func, *args)
+
+    async def aopen(self, name, mode="rb"):
+        """Open the specified file from storage, returning an AsyncFile."""
+        from .aio import AsyncFile
+
+        return AsyncFile(self, await self._run(self.open, name, mode))
+
+    async def asave(self, name, content):
+        return await self._run(self.save, name, content)
+
+    async def adelete(self, name):
+        return await self._run(self.delete, name)
+
+    async def aexists(self, name):
+        return await self._run(self.exists, name)
+
+    async def asize(self, name):
+        return await self._run(self.size, name)
+
+    async def amodified_time(self, name):
+        return await self._run(self.modified_time, name)
+
+    async def alistdir(self, path):
+        return await self._run(self.listdir, path)
+
+
+class MappedFile:
+    """
+    A read-only memory map of a stored file.
+
+    ``view`` is a memoryview over the mapping: slicing it, hashing it or
+    handing it to other libraries does not copy the data. Entering the
+    context returns the view; closing releases it and unmaps the file.
+    """
+
+    def __init__(self, path):
+        self.name = path
+        self._file = open(path, "rb")
+        try:
+            if os.fstat(self._file.fileno()).st_size:
+                self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+                self.view = memoryview(self._mmap)
+            else:
+                # empty files cannot be mapped.
+                self._mmap = None
+                self.view = memoryview(b"")
+        except BaseException:
+            self._file.close()
+            raise
+        self.closed = False
+
+    def __enter__(self):
+        return self.view
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return len(self.view)
+
+    def close(self):
+        if self.closed:
+            return
+        self.view.release()
+        try:
+            if self._mmap is not None:
+                self._mmap.close()
+        except BufferError:
+            raise BufferError(
+                "Slices of the view of {} are still in use.".format(self.name)
+            )
+        finally:
+            self._file.close()
+        self.closed = True
+
 
 class FileSystemStorage(Storage):
     """
     Standard local filesystem storage
+
+    Saves write to a temporary file in the target directory and rename it
+    into place, so readers never see a partial file. ``durability`` picks
+    what is flushed to disk before ``save`` returns:
+
+    * ``"none"``: nothing, the OS writes back whenever it likes.
+    * ``"file"``: the file contents are fsynced.
+    * ``"directory"``: the contents and the rename are fsynced.
+    * ``"batch"``: as ``"directory"``, but saves are committed in groups
+      every ``fsync_interval`` seconds and share the flushes.
+
+    ``serve`` can hand the transfer over to the front proxy: set
+    ``x_sendfile`` for Apache/lighttpd, or ``x_accel_redirect`` to the
+    internal nginx location mapped to ``location``.
+
+    With ``shard_depth``, files are spread over hashed subdirectories of
+    their directory (see ``flask_lagerung.sharding``); names are mapped
+    transparently. ``shard_fallback`` also looks for files at their plain
+    path, for trees being migrated.
     """
 
-    def __init__(self, location="", base_url=None):
+    def __init__(
+        self,
+        location="",
+        base_url=None,
+        durability=DURABILITY_NONE,
+        fsync_interval=0.01,
+        x_sendfile=False,
+        x_accel_redirect=None,
+        shard_depth=0,
+        shard_width=2,
+        shard_fallback=True,
+    ):
+        if durability not in DURABILITY_POLICIES:
+            raise ValueError(
+                "durability must be one of {}.".format(", ".join(DURABILITY_POLICIES))
+            )
+
         self.location = os.path.abspath(location)
         if base_url is not None and not base_url.endswith("/"):
             base_url += "/"
         self.base_url = base_url
+        self.durability = durability
+        self._group_sync = GroupSync(fsync_interval)
+
+        if x_accel_redirect is not None and not x_accel_redirect.endswith("/"):
+            x_accel_redirect += "/"
+        self.x_sendfile = x_sendfile
+        self.x_accel_redirect = x_accel_redirect
+
+        if shard_depth * shard_width > 40:
+            raise ValueError("shard_depth * shard_width can't exceed the 40 digits of a SHA-1.")
+        self.shard_depth = shard_depth
+        self.shard_width = shard_width
+        self.shard_fallback = shard_fallback
 
     def open(self, name, mode="rb"):
+        if mode == "mmap":
+            return self.view(name)
         return open(self.path(name), mode)
 
-    def path(self, name):
+    def view(self, name):
+        """Return a read-only MappedFile of the file, see ``open(name, "mmap")``."""
+        return MappedFile(self.path(name))
+
+    def _shard_path(self, name):
+        if self.shard_depth:
+            name = shard_name(name, self.shard_depth, self.shard_width)
         return os.path.join(self.location, name)
 
+    def path(self, name):
+        path = self._shard_path(name)
+        if self.shard_depth and not os.path.lexists(path):
+            # directories, and files not migrated yet, keep their plain path.
+            plain = os.path.join(self.location, name)
+            if os.path.isdir(plain) or (self.shard_fallback and os.path.lexists(plain)):
+                return plain
+        return path
+
+    def _relative(self, name):
+        """The path of ``name`` relative to ``location``, with forward slashes."""
+        if not self.shard_depth:
+            return name
+        return os.path.relpath(self.path(name), self.location).replace(os.sep, "/")
+
     def exists(self, name):
         return os.path.exists(self.path(name))
 
+    def size(self, name):
+        return os.path.getsize(self.path(name))
+
+    def modified_time(self, name):
+        return datetime.fromtimestamp(os.path.getmtime(self.path(name)), timezone.utc)
+
     def save(self, name, stream):
-        if isinstance(stream, StringIO):
-            mode = "w"
-        elif isinstance(stream, BytesIO):
-            mode = "wb"
-        elif isinstance(stream, SpooledTemporaryFile) or isinstance(stream, TemporaryFile):
-            mode = "wb+"
-        else:
-            raise TypeError("stream must be StringIO, BytesIO, SpooledTemporaryFile, TemporaryFile object")
+        # werkzeug's FileStorage wraps the real upload stream.
+        stream = getattr(stream, "stream", stream)
+        if not hasattr(stream, "read"):
+            raise TypeError("stream must be a file-like object")
+        mode = "w" if is_text_stream(stream) else "wb"
 
-        full_path = self.path(name)
+        if self.shard_depth:
+            for component in name.split("/")[:-1]:
+                if is_shard(component, self.shard_width):
+                    raise ValueError(
+                        "{} has a directory named like a shard directory.".format(name)
+                    )
+        full_path = self._shard_path(name)
 
         # create any intermediate directories that do not exist.
         directory = os.path.dirname(full_path)
-        if not os.path.exists(directory):
-            # there's a race between os.path.exists() and os.makedirs()...
-            os.makedirs(directory)
-
-        if not os.path.isdir(directory):
+        try:
+            os.makedirs(directory, exist_ok=True)
+        except FileExistsError:
             raise IOError("{} exists and is not a directory.".format(directory))
 
-        # if the uploaded file is too large, it can overwhelm the system!
-        # Therefore, I have to make the chunks of the uploaded files.
-        chunks = create_chunks(stream)
-        with open(full_path, mode) as f:
-            for chunk in chunks:
-                f.write(chunk)
+        temp_path = "{}.{}{}".format(full_path, secrets.token_hex(8), TEMP_SUFFIX)
+        try:
+            # if the uploaded file is too large, it can overwhelm the system!
+            # Therefore, I have to make the chunks of the uploaded files, or let
+            # the kernel copy it when the stream is backed by a file descriptor.
+            with open(temp_path, mode.replace("w", "x")) as f:
+                if mode == "w":
+                    for chunk in create_chunks(stream):
+                        f.write(chunk)
+                else:
+                    copy_stream(stream, f)
+
+                if self.durability in (DURABILITY_FILE, DURABILITY_DIRECTORY):
+                    f.flush()
+                    os.fsync(f.fileno())
+
+            if self.durability == DURABILITY_BATCH:
+                self._group_sync.commit(temp_path, full_path)
+            else:
+                os.replace(temp_path, full_path)
+                if self.durability == DURABILITY_DIRECTORY:
+                    fsync_directory(directory)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except FileNotFoundError:
+                pass
+            raise
 
         return name
 
+    def _scan(self, path):
+        """
+        Return the entries of the directory ``path`` by name, looking
+        through shard directories.
+        """
+        found = {}
+
+        def scan(directory, level):
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.name.endswith(TEMP_SUFFIX):
+                        continue
+                    is_dir = entry.is_dir()
+                    sharded = level < self.shard_depth and is_shard(entry.name, self.shard_width)
+                    if is_dir and sharded:
+                        scan(entry.path, level + 1)
+                    elif level == 0 or not is_dir:
+                        # a sharded copy wins over one not migrated yet.
+                        if level or entry.name not in found:
+                            found[entry.name] = entry
+
+        scan(os.path.join(self.location, path), 0)
+        return found
+
+    def scandir(self, path):
+        for name, entry in self._scan(path).items():
+            # the stat is cached on the entry, and free on Windows.
+            stat = entry.stat()
+            is_dir = entry.is_dir()
+            yield Entry(
+                join(path, name),
+                None if is_dir else stat.st_size,
+                datetime.fromtimestamp(stat.st_mtime, timezone.utc),
+                is_dir,
+            )
+
     def listdir(self, path):
-        path = self.path(path)
         directories, files = [], []
-        for entry in os.scandir(path):
+        for name, entry in self._scan(path).items():
             if entry.is_dir():
-                directories.append(entry.name)
+                directories.append(name)
             else:
-                files.append(entry.name)
+                files.append(name)
         return directories, files
 
     def url(self, name):
         if self.base_url is None:
             raise ValueError("This file is not accessible via a URL.")
 
-        url = filepath_to_uri(name)
+        url = filepath_to_uri(self._relative(name))
         if url is not None:
             url = url.lstrip("/")
 
         return urljoin(self.base_url, url)
 
+    def serve(self, name, **kwargs):
+        name = safe_name(name)
+        if self.x_accel_redirect is not None:
+            redirect = urljoin(
+                self.x_accel_redirect, filepath_to_uri(self._relative(name)).lstrip("/")
+            )
+            return serve_offloaded(self, name, "X-Accel-Redirect", redirect, **kwargs)
+        if self.x_sendfile:
+            return serve_offloaded(self, name, "X-Sendfile", self.path(name), **kwargs)
+        return super().serve(name, **kwargs)
+
     def delete(self, name):
-        name = self.path(name)
-        try:
-            if os.path.isdir(name):
-                os.rmdir(name)
-            else:
-                os.remove(name)
-        except FileNotFoundError:
-            pass
+        paths = [self.path(name)]
+        if self.shard_depth:
+            # a copy not migrated yet would come back otherwise.
+            paths.append(os.path.join(self.location, name))
+        for path in dict.fromkeys(paths):
+            try:
+                if os.path.isdir(path):
+                    os.rmdir(path)
+                else:
+                    os.remove(path)
+            except FileNotFoundError:
+                pass
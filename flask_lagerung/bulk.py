@@ -0,0 +1,73 @@
+import os
+from collections import namedtuple
+
+
+class BulkResult(namedtuple("BulkResult", ["name", "value", "error"])):
+    """The outcome of one item of a bulk operation."""
+
+    __slots__ = ()
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+def run_bulk(func, calls, concurrency):
+    """
+    Call ``func(*args)`` for every ``(name, args)`` of ``calls`` on up to
+    ``concurrency`` threads. Return a BulkResult per call, in order; errors
+    are captured instead of raised.
+    """
+
+    def call(item):
+        name, args = item
+        try:
+            return BulkResult(name, func(*args), None)
+        except Exception as e:
+            return BulkResult(name, None, e)
+
+    calls = list(calls)
+    if concurrency <= 1 or len(calls) <= 1:
+        return [call(item) for item in calls]
+
+    # imported here, it pulls in logging and is only needed in parallel.
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(calls))) as executor:
+        return list(executor.map(call, calls))
+
+
+def exists_many(storage, names, concurrency, coalesce_threshold=None):
+    """
+    Check many names at once. Directories holding at least
+    ``coalesce_threshold`` of the names are listed once instead of probing
+    each name; a failed listing falls back to single checks.
+    """
+    names = list(names)
+    groups = {}
+    for name in names:
+        groups.setdefault(os.path.dirname(name), set()).add(name)
+
+    single = []
+    listed = []
+    for directory, members in groups.items():
+        if coalesce_threshold is not None and len(members) >= coalesce_threshold:
+            listed.append((directory, members))
+        else:
+            single.extend(members)
+
+    results = {}
+    listings = run_bulk(
+        storage.listdir, [(d, (d,)) for d, _ in listed], concurrency
+    )
+    for (directory, members), listing in zip(listed, listings):
+        if not listing.ok:
+            single.extend(members)
+            continue
+        entries = set(listing.value[0]) | set(listing.value[1])
+        for name in members:
+            results[name] = BulkResult(name, os.path.basename(name) in entries, None)
+
+    for result in run_bulk(storage.exists, [(n, (n,)) for n in single], concurrency):
+        results[result.name] = result
+    return [results[name] for name in names]
@@ -0,0 +1,215 @@
+import io
+import zlib
+from collections import namedtuple
+
+from .utils import DEFAULT_CHUNK_SIZE, is_text_stream
+
+# ``compressor(level)`` and ``decompressor()`` return objects with
+# ``compress``/``flush`` and ``decompress`` methods, like zlib's.
+Codec = namedtuple("Codec", ["name", "encoding", "suffix", "compressor", "decompressor"])
+
+
+def _gzip():
+    return Codec(
+        "gzip",
+        "gzip",
+        ".gz",
+        lambda level: zlib.compressobj(6 if level is None else level, zlib.DEFLATED, 31),
+        lambda: zlib.decompressobj(31),
+    )
+
+
+def _zstd():
+    import zstandard
+
+    return Codec(
+        "zstd",
+        "zstd",
+        ".zst",
+        lambda level: zstandard.ZstdCompressor(level=3 if level is None else level).compressobj(),
+        lambda: zstandard.ZstdDecompressor().decompressobj(),
+    )
+
+
+class _Brotli:
+    """zlib-like interface of the brotli (de)compressors."""
+
+    def __init__(self, process, finish=None):
+        self.compress = self.decompress = process
+        self._finish = finish
+
+    def flush(self):
+        return self._finish() if self._finish is not None else b""
+
+
+def _brotli():
+    import brotli
+
+    def compressor(level):
+        c = brotli.Compressor(quality=5 if level is None else level)
+        return _Brotli(c.process, c.finish)
+
+    return Codec("brotli", "br", ".br", compressor, lambda: _Brotli(brotli.Decompressor().process))
+
+
+CODECS = {"gzip": _gzip, "zstd": _zstd, "brotli": _brotli}
+
+
+def get_codec(name):
+    """
+    Return the Codec called ``name``. zstd and brotli need the zstandard
+    and brotli packages, an ImportError is raised if they are missing.
+    """
+    try:
+        factory = CODECS[name]
+    except KeyError:
+        raise ValueError(
+            "Unknown codec {!r}, choose one of {}.".format(name, ", ".join(CODECS))
+        )
+    return factory()
+
+
+def available_codecs():
+    """Return the names of the codecs that can be used here."""
+    names = []
+    for name in CODECS:
+        try:
+            get_codec(name)
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+
+class CompressingReader(io.RawIOBase):
+    """
+    Read ``source`` compressed by ``codec``, compressing one chunk at a
+    time as the consumer reads. Text streams are encoded as UTF-8, and
+    seekable ones are read from their start like saves do.
+
+    It can be rewound, and seeked forward by compressing again, when
+    ``source`` is seekable, so that an interrupted upload can be resumed:
+    compression is deterministic for a given level.
+    """
+
+    def __init__(self, source, codec, level=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.source = source
+        self.codec = codec
+        self.level = level
+        self.chunk_size = chunk_size
+        self._text = is_text_stream(source)
+        if self.seekable():
+            source.seek(0)
+        self._reset()
+
+    def _reset(self):
+        self._compressor = self.codec.compressor(self.level)
+        self._buffer = bytearray()
+        self._eof = False
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return getattr(self.source, "seekable", lambda: False)()
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence != io.SEEK_SET:
+            # the compressed size is only known once all is compressed.
+            raise io.UnsupportedOperation("can only seek from the start")
+        if offset == self._pos:
+            return offset
+        if not self.seekable():
+            raise io.UnsupportedOperation("the source stream is not seekable")
+
+        if offset < self._pos:
+            self.source.seek(0)
+            self._reset()
+        while self._pos < offset and self.read(min(offset - self._pos, self.chunk_size)):
+            pass
+        return self._pos
+
+    def _fill(self, size):
+        while (size < 0 or len(self._buffer) < size) and not self._eof:
+            data = self.source.read(self.chunk_size)
+            if self._text:
+                data = data.encode("utf-8")
+            if data:
+                self._buffer += self._compressor.compress(data)
+            else:
+                self._buffer += self._compressor.flush()
+                self._eof = True
+
+    def readinto(self, b):
+        self._fill(len(b))
+        size = min(len(b), len(self._buffer))
+        b[:size] = self._buffer[:size]
+        del self._buffer[:size]
+        self._pos += size
+        return size
+
+
+class DecompressingReader(io.RawIOBase):
+    """Read the ``codec`` compressed file ``raw`` decompressed."""
+
+    def __init__(self, raw, codec, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.raw = raw
+        self.chunk_size = chunk_size
+        self._decompressor = codec.decompressor()
+        self._buffer = bytearray()
+        self._eof = False
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self._buffer and not self._eof:
+            data = self.raw.read(self.chunk_size)
+            if data:
+                self._buffer += self._decompressor.decompress(data)
+            else:
+                flush = getattr(self._decompressor, "flush", None)
+                if flush is not None:
+                    self._buffer += flush()
+                self._eof = True
+        size = min(len(b), len(self._buffer))
+        b[:size] = self._buffer[:size]
+        del self._buffer[:size]
+        return size
+
+    def close(self):
+        if not self.closed:
+            self.raw.close()
+        super().close()
+
+
+class CompressingWriter(io.RawIOBase):
+    """Compress what is written into the file ``raw``, flushed on close."""
+
+    def __init__(self, raw, codec, level=None):
+        self.raw = raw
+        self._compressor = codec.compressor(level)
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        data = self._compressor.compress(bytes(b))
+        if data:
+            self.raw.write(data)
+        return len(b)
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            self.raw.write(self._compressor.flush())
+        finally:
+            self.raw.close()
+            super().close()
@@ -0,0 +1,144 @@
+import bisect
+import threading
+from collections import namedtuple
+
+# upper bounds in seconds of the duration histogram buckets.
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, float("inf")
+)
+
+
+class OperationEvent(
+    namedtuple(
+        "OperationEvent",
+        ["backend", "operation", "name", "duration", "bytes", "round_trips", "error"],
+    )
+):
+    """
+    One storage operation, as passed to the listeners of an
+    InstrumentedStorage. ``bytes`` and ``round_trips`` are None when the
+    backend can't tell them.
+    """
+
+    __slots__ = ()
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+class _Series:
+    __slots__ = ("count", "errors", "buckets", "duration", "bytes", "round_trips")
+
+    def __init__(self, size):
+        self.count = 0
+        self.errors = 0
+        self.buckets = [0] * size
+        self.duration = 0.0
+        self.bytes = 0
+        self.round_trips = 0
+
+
+class Metrics:
+    """
+    In-memory aggregate of OperationEvents, usable as a listener.
+
+    For every backend and operation it keeps call and error counts, a
+    histogram of the durations and the total bytes and round trips.
+    ``view`` serves them in the Prometheus text format:
+
+        metrics = Metrics()
+        storage = InstrumentedStorage(FTPStorage(url), [metrics])
+        app.add_url_rule("/metrics", view_func=metrics.view)
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        if self.buckets[-1] != float("inf"):
+            self.buckets += (float("inf"),)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        key = (event.backend, event.operation)
+        index = bisect.bisect_left(self.buckets, event.duration)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series(len(self.buckets))
+            series.count += 1
+            if not event.ok:
+                series.errors += 1
+            series.buckets[index] += 1
+            series.duration += event.duration
+            series.bytes += event.bytes or 0
+            series.round_trips += event.round_trips or 0
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def snapshot(self):
+        """Return ``{(backend, operation): {...}}`` with cumulative bucket counts."""
+        with self._lock:
+            snapshot = {}
+            for key, series in self._series.items():
+                cumulative, total = [], 0
+                for count in series.buckets:
+                    total += count
+                    cumulative.append(total)
+                snapshot[key] = {
+                    "count": series.count,
+                    "errors": series.errors,
+                    "buckets": list(zip(self.buckets, cumulative)),
+                    "duration": series.duration,
+                    "bytes": series.bytes,
+                    "round_trips": series.round_trips,
+                }
+        return snapshot
+
+    def render(self):
+        """
+        Return the metrics in the Prometheus text exposition format, the
+        samples of each family grouped after its TYPE line.
+        """
+        series = [
+            ('backend="{}",operation="{}"'.format(backend, operation), values)
+            for (backend, operation), values in sorted(self.snapshot().items())
+        ]
+
+        lines = ["# TYPE lagerung_operation_duration_seconds histogram"]
+        for labels, values in series:
+            for bound, count in values["buckets"]:
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(
+                    'lagerung_operation_duration_seconds_bucket{{{},le="{}"}} {}'.format(
+                        labels, le, count
+                    )
+                )
+            lines.append(
+                "lagerung_operation_duration_seconds_sum{{{}}} {}".format(
+                    labels, values["duration"]
+                )
+            )
+            lines.append(
+                "lagerung_operation_duration_seconds_count{{{}}} {}".format(
+                    labels, values["count"]
+                )
+            )
+
+        for metric in ("errors", "bytes", "round_trips"):
+            lines.append("# TYPE lagerung_operation_{}_total counter".format(metric))
+            for labels, values in series:
+                lines.append(
+                    "lagerung_operation_{}_total{{{}}} {}".format(metric, labels, values[metric])
+                )
+        return "\n".join(lines) + "\n"
+
+    def view(self):
+        """A Flask view returning ``render()``."""
+        from flask import current_app
+
+        return current_app.response_class(
+            self.render(), mimetype="text/plain; version=0.0.4"
+        )
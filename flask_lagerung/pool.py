@@ -0,0 +1,228 @@
+import threading
+import time
+
+
+class PoolTimeout(Exception):
+    """No connection became available before the checkout timeout."""
+
+
+class _PooledConnection:
+    __slots__ = ("connection", "created_at", "last_used")
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+
+class ConnectionPool:
+    """
+    A bounded, thread-safe pool of connections.
+
+    ``factory`` is called to open a new connection and ``close`` to dispose
+    of one. At most ``max_size`` connections are open at any time; idle
+    connections beyond ``min_size`` are closed after ``idle_timeout`` seconds
+    and every connection is retired after ``max_lifetime`` seconds.
+
+    When ``ping`` is given, a connection idle for more than ``ping_after``
+    seconds is passed to it before being handed out; if it raises, the
+    peer dropped the connection and another one is checked out.
+    """
+
+    def __init__(
+        self,
+        factory,
+        close=None,
+        min_size=0,
+        max_size=4,
+        idle_timeout=60,
+        max_lifetime=None,
+        timeout=None,
+        ping=None,
+        ping_after=1,
+    ):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1.")
+        if min_size > max_size:
+            raise ValueError("min_size cannot be greater than max_size.")
+
+        self.factory = factory
+        self.close = close
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.max_lifetime = max_lifetime
+        self.timeout = timeout
+        self.ping = ping
+        self.ping_after = ping_after
+
+        self._cond = threading.Condition()
+        self._idle = []
+        self._in_use = {}
+        self._size = 0
+
+        self._created = 0
+        self._discarded = 0
+        self._waits = 0
+        self._wait_time = 0.0
+
+    def _is_expired(self, entry, now, idle=True):
+        if self.max_lifetime is not None and now - entry.created_at > self.max_lifetime:
+            return True
+        if (
+            idle
+            and self.idle_timeout is not None
+            and self._size > self.min_size
+            and now - entry.last_used > self.idle_timeout
+        ):
+            return True
+        return False
+
+    def _prune(self, now):
+        """Remove expired idle connections. Must hold the lock."""
+        expired = []
+        # the idle list is ordered by last use, the oldest come first.
+        for entry in list(self._idle):
+            if self._is_expired(entry, now):
+                self._idle.remove(entry)
+                self._size -= 1
+                self._discarded += 1
+                expired.append(entry.connection)
+        return expired
+
+    def _dispose(self, connections):
+        if self.close is None:
+            return
+        for connection in connections:
+            try:
+                self.close(connection)
+            except Exception:
+                pass
+
+    def _is_alive(self, entry):
+        """Ping ``entry`` if it has been idle long enough, discard it if dead."""
+        if self.ping is None or time.monotonic() - entry.last_used <= self.ping_after:
+            return True
+        try:
+            self.ping(entry.connection)
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._discarded += 1
+                self._cond.notify()
+            self._dispose([entry.connection])
+            return False
+        return True
+
+    def acquire(self, timeout=None):
+        """
+        Check out a connection, waiting up to ``timeout`` seconds (the pool
+        default when omitted) for one to become available.
+        """
+        if timeout is None:
+            timeout = self.timeout
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        expired = []
+        entry = None
+        create = False
+        timed_out = False
+        started = None
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                expired.extend(self._prune(now))
+                if self._idle:
+                    entry = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    create = True
+                    break
+
+                if started is None:
+                    started = now
+                    self._waits += 1
+                if deadline is None:
+                    self._cond.wait()
+                    continue
+                remaining = deadline - now
+                if remaining <= 0:
+                    timed_out = True
+                    break
+                self._cond.wait(remaining)
+
+            if started is not None:
+                self._wait_time += time.monotonic() - started
+
+        self._dispose(expired)
+        if timed_out:
+            raise PoolTimeout(
+                "No connection available within {} seconds.".format(timeout)
+            )
+
+        if create:
+            try:
+                entry = _PooledConnection(self.factory())
+            except BaseException:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+        elif not self._is_alive(entry):
+            if deadline is not None:
+                timeout = max(deadline - time.monotonic(), 0)
+            return self.acquire(timeout)
+
+        with self._cond:
+            if create:
+                self._created += 1
+            self._in_use[id(entry.connection)] = entry
+        return entry.connection
+
+    def release(self, connection, discard=False):
+        """
+        Return a checked out connection to the pool. Broken connections
+        should be released with ``discard=True`` so they get closed.
+        """
+        with self._cond:
+            entry = self._in_use.pop(id(connection), None)
+            if entry is None:
+                raise ValueError("Connection does not belong to this pool.")
+
+            now = time.monotonic()
+            if discard or self._is_expired(entry, now, idle=False):
+                self._size -= 1
+                self._discarded += 1
+                to_close = [connection]
+            else:
+                entry.last_used = now
+                self._idle.append(entry)
+                to_close = []
+            to_close.extend(self._prune(now))
+            self._cond.notify()
+
+        self._dispose(to_close)
+
+    def clear(self):
+        """Close every idle connection."""
+        with self._cond:
+            idle = [entry.connection for entry in self._idle]
+            self._size -= len(idle)
+            self._discarded += len(idle)
+            self._idle = []
+            self._cond.notify_all()
+        self._dispose(idle)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self._size,
+                "max_size": self.max_size,
+                "in_use": len(self._in_use),
+                "idle": len(self._idle),
+                "waits": self._waits,
+                "wait_time": self._wait_time,
+                "created": self._created,
+                "discarded": self._discarded,
+            }
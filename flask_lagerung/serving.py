@@ -0,0 +1,116 @@
+import mimetypes
+import os
+
+from .utils import DEFAULT_CHUNK_SIZE
+
+
+def safe_name(name):
+    """
+    Return ``name`` if it stays within the storage, like the names
+    send_from_directory accepts, else raise NotFound: served names usually
+    come from the request path.
+    """
+    from werkzeug.exceptions import NotFound
+    from werkzeug.security import safe_join
+
+    if not name or safe_join(".", name) is None:
+        raise NotFound()
+    return name
+
+
+def _metadata(storage, name):
+    """Return ``(size, modified_time)``, None for what the backend can't tell."""
+    from werkzeug.exceptions import NotFound
+
+    metadata = []
+    for method in (storage.size, storage.modified_time):
+        try:
+            metadata.append(method(name))
+        except NotImplementedError:
+            metadata.append(None)
+        except Exception:
+            if not storage.exists(name):
+                raise NotFound()
+            raise
+    return metadata
+
+
+def _prepare(rv, name, size, modified, as_attachment, download_name, max_age):
+    if size is not None:
+        rv.content_length = size
+    if modified is not None:
+        rv.last_modified = modified
+        if size is not None:
+            # derived from the metadata, hashing the content would cost a
+            # full read of the file. It is strong so If-Range can use it.
+            rv.set_etag("{:x}-{:x}".format(int(modified.timestamp() * 1e6), size))
+
+    if max_age is not None:
+        rv.cache_control.public = True
+        rv.cache_control.max_age = max_age
+
+    if as_attachment or download_name is not None:
+        rv.headers.set(
+            "Content-Disposition",
+            "attachment" if as_attachment else "inline",
+            filename=download_name or os.path.basename(name),
+        )
+
+
+def serve(
+    storage,
+    name,
+    mimetype=None,
+    as_attachment=False,
+    download_name=None,
+    max_age=None,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+):
+    """
+    Return a streaming response for the file ``name`` in ``storage``.
+
+    The body is read chunk by chunk while it is sent. Range requests are
+    answered with 206 by seeking the file, and If-None-Match /
+    If-Modified-Since with 304 before any data is read.
+    """
+    from flask import current_app, request
+    from werkzeug.wsgi import wrap_file
+
+    size, modified = _metadata(storage, name)
+    if mimetype is None:
+        mimetype = mimetypes.guess_type(name)[0] or "application/octet-stream"
+
+    f = storage.open(name, "rb")
+    rv = current_app.response_class(
+        wrap_file(request.environ, f, chunk_size),
+        mimetype=mimetype,
+        direct_passthrough=True,
+    )
+    _prepare(rv, name, size, modified, as_attachment, download_name, max_age)
+    return rv.make_conditional(request, accept_ranges=True, complete_length=size)
+
+
+def serve_offloaded(
+    storage,
+    name,
+    header,
+    value,
+    mimetype=None,
+    as_attachment=False,
+    download_name=None,
+    max_age=None,
+):
+    """
+    Return an empty response that asks the front proxy to send the file,
+    through ``X-Sendfile`` or ``X-Accel-Redirect``.
+    """
+    from flask import current_app, request
+
+    size, modified = _metadata(storage, name)
+    if mimetype is None:
+        mimetype = mimetypes.guess_type(name)[0] or "application/octet-stream"
+
+    rv = current_app.response_class(mimetype=mimetype)
+    rv.headers[header] = value
+    _prepare(rv, name, size, modified, as_attachment, download_name, max_age)
+    return rv.make_conditional(request)
@@ -0,0 +1,134 @@
+"""
+Hashed fan-out of the files of a FileSystemStorage.
+
+A file ``dir/name`` is stored as ``dir/_3f/_a2/name``: ``shard_depth``
+directory levels named after the hash of ``name``, ``shard_width`` hex
+digits each, so that no directory grows beyond a few thousand entries.
+Files stay in their directory, only the last path component is hashed.
+
+An existing tree can be re-sharded while it is in use:
+
+    python -m flask_lagerung.sharding /srv/media --depth 2 --width 2
+"""
+import hashlib
+import os
+import posixpath
+import re
+
+SHARD_PREFIX = "_"
+
+
+def shard_name(name, depth, width):
+    """Return the relative path of ``name`` in a layout of ``depth`` levels."""
+    if not depth:
+        return name
+    directory, filename = posixpath.split(name)
+    digest = hashlib.sha1(filename.encode("utf-8")).hexdigest()
+    shards = [SHARD_PREFIX + digest[i * width : (i + 1) * width] for i in range(depth)]
+    return posixpath.join(directory, *shards, filename)
+
+
+def is_shard(component, width):
+    return re.fullmatch(r"{}[0-9a-f]{{{}}}".format(SHARD_PREFIX, width), component) is not None
+
+
+def logical_name(path, width):
+    """Return the name of the file at the relative ``path``, without its shards."""
+    components = path.split("/")
+    filename = components.pop()
+    while components and is_shard(components[-1], width):
+        components.pop()
+    return posixpath.join(*components, filename)
+
+
+def _move(source, target):
+    """
+    Move ``source`` to ``target`` unless ``target`` exists: it was then
+    written through the new layout and is newer.
+    """
+    try:
+        # a hard link never replaces the target and readers always find the
+        # file at one of the two paths.
+        os.link(source, target)
+    except FileExistsError:
+        pass
+    except OSError:
+        if not os.path.lexists(target):
+            os.replace(source, target)
+            return
+    os.remove(source)
+
+
+def reshard(storage, from_width=None, dry_run=False):
+    """
+    Move every file of the FileSystemStorage ``storage`` where its current
+    layout puts it, from a plain tree or from another depth or width
+    (``from_width``). Return the number of files moved.
+
+    Sharding a plain tree can be done while the storage is in use: with
+    ``shard_fallback`` files not moved yet are found at their plain path.
+    Changing the depth or width of shards is better done offline.
+    """
+    from .base import TEMP_SUFFIX
+
+    from_width = from_width or storage.shard_width
+    moved = 0
+    for root, _, files in os.walk(storage.location, topdown=False):
+        for filename in files:
+            if filename.endswith(TEMP_SUFFIX):
+                continue
+            source = os.path.join(root, filename)
+            relative = os.path.relpath(source, storage.location).replace(os.sep, "/")
+            name = logical_name(relative, from_width)
+            target = os.path.join(
+                storage.location, shard_name(name, storage.shard_depth, storage.shard_width)
+            )
+            if os.path.normpath(target) == os.path.normpath(source):
+                continue
+
+            moved += 1
+            if not dry_run:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                _move(source, target)
+
+        # drop the shard directories the new layout doesn't use, saves may be
+        # creating the others concurrently.
+        relative = os.path.relpath(root, storage.location).replace(os.sep, "/")
+        level = 0
+        for component in reversed(relative.split("/")):
+            if not is_shard(component, from_width):
+                break
+            level += 1
+        if level and not dry_run and (
+            level > storage.shard_depth or from_width != storage.shard_width
+        ):
+            try:
+                os.rmdir(root)
+            except OSError:
+                # not empty.
+                pass
+    return moved
+
+
+def main(args=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("location")
+    parser.add_argument("--depth", type=int, default=2, help="0 flattens the tree back")
+    parser.add_argument("--width", type=int, default=2)
+    parser.add_argument("--from-width", type=int, help="width of the current shards")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args(args)
+
+    from .base import FileSystemStorage
+
+    storage = FileSystemStorage(args.location, shard_depth=args.depth, shard_width=args.width)
+    moved = reshard(storage, args.from_width, args.dry_run)
+    print("{} {} files".format("Would move" if args.dry_run else "Moved", moved))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import os
+import threading
+import time
+
+
+def fsync_path(path):
+    """Flush a file or directory to stable storage by its path."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def fsync_directory(directory):
+    """
+    Make a rename in ``directory`` durable. Platforms that cannot open a
+    directory (Windows) are skipped.
+    """
+    if os.name != "posix":
+        return
+    fsync_path(directory)
+
+
+class _Commit:
+    __slots__ = ("temp_path", "path", "done", "error")
+
+    def __init__(self, temp_path, path):
+        self.temp_path = temp_path
+        self.path = path
+        self.done = False
+        self.error = None
+
+
+class GroupSync:
+    """
+    Group commit of atomic writes.
+
+    Callers hand over a fully written temporary file and block. Every
+    ``interval`` seconds a background thread fsyncs all pending files,
+    renames them into place and fsyncs their directories once, so
+    concurrent saves share the cost of the flushes.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._cond = threading.Condition()
+        self._pending = []
+        self._thread = None
+
+    def commit(self, temp_path, path):
+        """Durably move ``temp_path`` to ``path``, waiting for the next batch."""
+        commit = _Commit(temp_path, path)
+        with self._cond:
+            self._pending.append(commit)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="lagerung-group-sync", daemon=True
+                )
+                self._thread.start()
+            while not commit.done:
+                self._cond.wait()
+
+        if commit.error is not None:
+            raise commit.error
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._cond:
+                batch, self._pending = self._pending, []
+                if not batch:
+                    self._thread = None
+                    return
+
+            self._flush(batch)
+            with self._cond:
+                for commit in batch:
+                    commit.done = True
+                self._cond.notify_all()
+
+    def _flush(self, batch):
+        directories = {}
+        for commit in batch:
+            try:
+                fsync_path(commit.temp_path)
+                os.replace(commit.temp_path, commit.path)
+            except OSError as e:
+                commit.error = e
+                continue
+            directories.setdefault(os.path.dirname(commit.path), []).append(commit)
+
+        for directory, commits in directories.items():
+            try:
+                fsync_directory(directory)
+            except OSError as e:
+                for commit in commits:
+                    commit.error = e
@@ -1,19 +1,190 @@
+import io
+import os
+import stat
+from tempfile import SpooledTemporaryFile
 from urllib.parse import quote
 
 
 DEFAULT_CHUNK_SIZE = 64 * 2 ** 10
 
-def create_chunks(stream, chunk_size=DEFAULT_CHUNK_SIZE):
-    stream.seek(0)
-    while True:
-        data = stream.read(chunk_size)
-        if not data:
-            break
-        yield data
+# upper bound of a single copy_file_range()/sendfile() call.
+KERNEL_COPY_SIZE = 2 ** 30
 
 
 def filepath_to_uri(path):
     if path is None:
         return path
     
-    return quote(path.replace("\\", "/"), safe="/~!*()'")
\ No newline at end of file
+    return quote(path.replace("\\", "/"), safe="/~!*()'")
+
+
+def get_fileno(stream):
+    """
+    Return the OS file descriptor behind ``stream``, or None when there is
+    none. An in-memory SpooledTemporaryFile is not forced onto disk.
+    """
+    if isinstance(stream, SpooledTemporaryFile) and not stream._rolled:
+        return None
+    try:
+        return stream.fileno()
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def _copy_file_range(in_fd, out_fd, offset):
+    return os.copy_file_range(in_fd, out_fd, KERNEL_COPY_SIZE, offset)
+
+
+def _sendfile(in_fd, out_fd, offset):
+    return os.sendfile(out_fd, in_fd, offset, KERNEL_COPY_SIZE)
+
+
+def kernel_copy(in_fd, out_fd, offset=None):
+    """
+    Copy everything from ``in_fd`` (starting at ``offset``, or the current
+    position) to ``out_fd`` without passing the data through Python.
+
+    Return the number of bytes copied, or None if the kernel cannot copy
+    between these descriptors and nothing has been written.
+    """
+    methods = []
+    if hasattr(os, "copy_file_range"):
+        methods.append(_copy_file_range)
+    if hasattr(os, "sendfile"):
+        methods.append(_sendfile)
+
+    for copy in methods:
+        copied = 0
+        try:
+            while True:
+                sent = copy(in_fd, out_fd, None if offset is None else offset + copied)
+                if not sent:
+                    return copied
+                copied += sent
+        except OSError:
+            # EXDEV, EINVAL, ENOSYS... try the next method, unless part of
+            # the data was already written.
+            if copied:
+                raise
+    return None
+
+
+# largest buffer chosen by chunk_size_for() for local copies.
+MAX_CHUNK_SIZE = 2 ** 20
+
+
+def stream_size(stream):
+    """
+    Return the size of the whole ``stream`` from an fstat or by seeking to
+    its end, None when it cannot be known (pipes, sockets...).
+    """
+    if isinstance(stream, (bytes, bytearray, memoryview)):
+        return len(stream)
+    fileno = get_fileno(stream)
+    if fileno is not None:
+        try:
+            st = os.fstat(fileno)
+        except OSError:
+            pass
+        else:
+            if stat.S_ISREG(st.st_mode):
+                return st.st_size
+    try:
+        if not stream.seekable():
+            return None
+        position = stream.tell()
+        size = stream.seek(0, io.SEEK_END)
+        stream.seek(position)
+        return size
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def chunk_size_for(stream, minimum=DEFAULT_CHUNK_SIZE, maximum=MAX_CHUNK_SIZE):
+    """
+    Pick a chunk size for reading ``stream``: small streams are read in one
+    chunk of their size, large ones in chunks growing with the size (about
+    64 reads) between ``minimum`` and ``maximum``.
+    """
+    size = stream_size(stream)
+    if size is None:
+        return minimum
+    if size <= minimum:
+        # one more byte so that the first read reaches the end.
+        return size + 1
+    chunk_size = minimum
+    while chunk_size * 64 < size and chunk_size < maximum:
+        chunk_size *= 2
+    return min(chunk_size, maximum)
+
+
+def iter_chunks(stream, chunk_size=None, reuse_buffer=False):
+    """
+    Yield the rest of ``stream`` in chunks of at most ``chunk_size`` bytes
+    (see chunk_size_for when None).
+
+    With ``reuse_buffer``, binary streams are read with ``readinto`` into a
+    single buffer and the chunks are memoryviews of it, valid only until
+    the next one is requested.
+    """
+    if chunk_size is None:
+        chunk_size = chunk_size_for(stream)
+
+    readinto = getattr(stream, "readinto", None) if reuse_buffer else None
+    if readinto is None:
+        while True:
+            data = stream.read(chunk_size)
+            if not data:
+                break
+            yield data
+        return
+
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    while True:
+        size = readinto(buffer)
+        if not size:
+            break
+        yield view[:size]
+
+
+def create_chunks(stream, chunk_size=None, reuse_buffer=False):
+    """
+    Yield ``stream`` in chunks like iter_chunks, from its start when it is
+    seekable.
+    """
+    if getattr(stream, "seekable", lambda: False)():
+        stream.seek(0)
+    yield from iter_chunks(stream, chunk_size, reuse_buffer)
+
+
+def copy_stream(stream, f, chunk_size=None):
+    """
+    Copy the binary ``stream`` into the file object ``f`` from the start of
+    the stream when it is seekable. File descriptors are copied by the
+    kernel, other streams through a single reusable buffer.
+    """
+    offset = None
+    if getattr(stream, "seekable", lambda: False)():
+        stream.seek(0)
+        offset = 0
+
+    in_fd = get_fileno(stream)
+    out_fd = get_fileno(f)
+    if in_fd is not None and out_fd is not None:
+        f.flush()
+        copied = kernel_copy(in_fd, out_fd, offset)
+        if copied is not None:
+            return copied
+
+    copied = 0
+    for chunk in iter_chunks(stream, chunk_size, reuse_buffer=True):
+        f.write(chunk)
+        copied += len(chunk)
+    return copied
+
+
+def is_text_stream(stream):
+    if isinstance(stream, SpooledTemporaryFile):
+        return "b" not in stream.mode
+    return isinstance(stream, io.TextIOBase)
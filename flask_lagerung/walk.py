@@ -0,0 +1,55 @@
+import posixpath
+from collections import namedtuple
+from itertools import islice
+
+
+class Entry(namedtuple("Entry", ["name", "size", "modified", "is_dir"])):
+    """
+    A file or directory found while walking a storage. ``name`` is relative
+    to the storage root; ``size`` is None for directories and ``size`` or
+    ``modified`` are None when the backend can't tell them.
+    """
+
+    __slots__ = ()
+
+
+def join(path, name):
+    path = path.strip("/")
+    return posixpath.join(path, name) if path else name
+
+
+def _key(name):
+    # compare names component by component, the order of a depth-first walk.
+    return tuple(name.strip("/").split("/"))
+
+
+def _walk(storage, path, cursor):
+    entries = sorted(storage.scandir(path), key=lambda entry: _key(entry.name))
+    for entry in entries:
+        key = _key(entry.name)
+        if cursor is not None and key <= cursor:
+            # seen already, but a directory may still hold what comes after
+            # the cursor.
+            if entry.is_dir and cursor[: len(key)] == key:
+                yield from _walk(storage, entry.name, cursor)
+            continue
+
+        yield entry
+        if entry.is_dir:
+            yield from _walk(storage, entry.name, None)
+
+
+def walk(storage, path="", page_size=None, cursor=None, files_only=False):
+    """
+    Lazily yield the Entries below ``path`` of ``storage``, depth first,
+    listing one directory at a time.
+
+    The order is stable, so a walk can be resumed after the entry named
+    ``cursor``, e.g. the last one of a previous page of ``page_size``.
+    """
+    entries = _walk(storage, path, _key(cursor) if cursor else None)
+    if files_only:
+        entries = (entry for entry in entries if not entry.is_dir)
+    if page_size is not None:
+        entries = islice(entries, page_size)
+    return entries
@@ -12,12 +12,12 @@ NAME = "flask-lagerung"
 DESCRIPTION = "Support for many storage backends in Flask"
 EMAIL = "afai97202013@gmail.com"
 AUTHOR = "CHI-HUI CHOU"
-REQUIRES_PYTHON = ">=3.6.0"
+REQUIRES_PYTHON = ">=3.7.0"
 VERSION = "0.1.3"
 
 # Which packages are required for this module to be executed?
 REQUIRED = [
-
+    "Flask",
 ]
 
 # Packages
@@ -64,7 +64,7 @@ setup(
     include_package_data=True,
     license="MIT",
     classifiers=[
-        "Programming Language :: Python :: 3.6",
+        "Programming Language :: Python :: 3.7",
     ],
     setup_requires=["wheel"],
 )
\ No newline at end of file
@@ -1,9 +1,12 @@
+import hashlib
 import os
 from io import BytesIO, StringIO
 import shutil
 import sys
 import tempfile
+import threading
 import unittest
+from datetime import datetime, timezone
 
 from flask_lagerung import FileSystemStorage
 
@@ -126,3 +129,204 @@ class FileStorageTests(unittest.TestCase):
         
         storage = FileSystemStorage(location=self.temp_dir, base_url='/no_ending_slash')
         self.assertEqual(storage.url('test.file'), "{}{}".format(storage.base_url, 'test.file'))
+
+    def test_file_size_and_modified_time(self):
+        self.storage.save('test.file', BytesIO(b'custom content'))
+        self.assertEqual(self.storage.size('test.file'), 14)
+
+        modified_time = self.storage.modified_time('test.file')
+        self.assertEqual(modified_time.tzinfo, timezone.utc)
+        self.assertLess(abs((datetime.now(timezone.utc) - modified_time).total_seconds()), 60)
+
+        with self.assertRaises(FileNotFoundError):
+            self.storage.size('missing.file')
+
+    def test_file_save_from_file_descriptor(self):
+        """
+        Streams backed by a real file, including a rolled over spooled upload,
+        are saved in full.
+        """
+        content = os.urandom(300 * 1024)
+        source = os.path.join(self.temp_dir, 'source.file')
+        with open(source, 'wb') as f:
+            f.write(content)
+
+        with open(source, 'rb') as f:
+            f.read(10)
+            self.storage.save('from_file', f)
+        with self.storage.open('from_file') as f:
+            self.assertEqual(f.read(), content)
+
+        spooled = tempfile.SpooledTemporaryFile(max_size=1024)
+        spooled.write(content)
+        self.assertTrue(spooled._rolled)
+        self.storage.save('from_spooled', spooled)
+        with self.storage.open('from_spooled') as f:
+            self.assertEqual(f.read(), content)
+
+    def test_file_save_in_memory_spooled(self):
+        spooled = tempfile.SpooledTemporaryFile(max_size=1024)
+        spooled.write(b'spooled content')
+        self.storage.save('from_spooled', spooled)
+        self.assertFalse(spooled._rolled)
+        with self.storage.open('from_spooled') as f:
+            self.assertEqual(f.read(), b'spooled content')
+
+    def test_file_save_any_file_like(self):
+        class Upload:
+            def __init__(self, data):
+                self.stream = BytesIO(data)
+
+        class ReadOnly:
+            def __init__(self, data):
+                self.data = BytesIO(data)
+
+            def read(self, size=-1):
+                return self.data.read(size)
+
+            def seek(self, offset):
+                self.data.seek(offset)
+
+        self.storage.save('upload', Upload(b'uploaded'))
+        self.storage.save('read_only', ReadOnly(b'read only'))
+        with self.storage.open('upload') as f:
+            self.assertEqual(f.read(), b'uploaded')
+        with self.storage.open('read_only') as f:
+            self.assertEqual(f.read(), b'read only')
+
+        with self.assertRaises(TypeError):
+            self.storage.save('invalid', b'not a stream')
+
+    def test_file_save_atomic(self):
+        """
+        A failing save leaves neither a partial file nor its temporary file.
+        """
+        self.storage.save('atomic.file', BytesIO(b'old content'))
+
+        class Failing(BytesIO):
+            def readinto(self, buffer):
+                raise IOError('connection reset')
+
+        with self.assertRaises(IOError):
+            self.storage.save('atomic.file', Failing(b'new content'))
+
+        with self.storage.open('atomic.file') as f:
+            self.assertEqual(f.read(), b'old content')
+        self.assertEqual(os.listdir(self.temp_dir), ['atomic.file'])
+
+    def test_file_save_durability(self):
+        for durability in ('none', 'file', 'directory', 'batch'):
+            storage = FileSystemStorage(location=self.temp_dir, durability=durability)
+            storage.save('durable/' + durability, BytesIO(durability.encode()))
+            with storage.open('durable/' + durability) as f:
+                self.assertEqual(f.read(), durability.encode())
+
+        with self.assertRaises(ValueError):
+            FileSystemStorage(location=self.temp_dir, durability='sometimes')
+
+    def test_file_save_batch_concurrent(self):
+        storage = FileSystemStorage(location=self.temp_dir, durability='batch')
+        threads = [
+            threading.Thread(target=storage.save, args=('batch_%d' % i, BytesIO(b'%d' % i)))
+            for i in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(storage.listdir('')[1]), ['batch_%d' % i for i in range(8)])
+
+    def test_file_save_directory_is_file(self):
+        self.storage.save('file', BytesIO(b'content'))
+        with self.assertRaises(IOError):
+            self.storage.save('file/nested', BytesIO(b'content'))
+
+    def test_bulk_operations(self):
+        results = self.storage.save_many(
+            [('bulk/%d' % i, BytesIO(b'%d' % i)) for i in range(10)] +
+            [('invalid', b'not a stream')]
+        )
+        self.assertEqual([r.name for r in results[:10]], ['bulk/%d' % i for i in range(10)])
+        self.assertTrue(all(r.ok for r in results[:10]))
+        self.assertFalse(results[10].ok)
+        self.assertIsInstance(results[10].error, TypeError)
+
+        results = self.storage.exists_many(['bulk/0', 'bulk/9', 'bulk/10'])
+        self.assertEqual([r.value for r in results], [True, True, False])
+
+        results = self.storage.delete_many(['bulk/%d' % i for i in range(5)])
+        self.assertTrue(all(r.ok for r in results))
+        self.assertEqual(len(self.storage.listdir('bulk')[1]), 5)
+
+    def test_file_view(self):
+        """
+        Files can be opened as a read-only memory map without copying them.
+        """
+        self.storage.save('mapped.file', BytesIO(b'0123456789'))
+
+        with self.storage.open('mapped.file', 'mmap') as view:
+            self.assertIsInstance(view, memoryview)
+            self.assertTrue(view.readonly)
+            self.assertEqual(bytes(view[2:5]), b'234')
+            self.assertEqual(hashlib.sha256(view).hexdigest(), hashlib.sha256(b'0123456789').hexdigest())
+            with self.assertRaises(TypeError):
+                view[0] = 0
+
+        mapped = self.storage.view('mapped.file')
+        self.assertEqual(len(mapped), 10)
+        mapped.close()
+        self.assertTrue(mapped.closed)
+        with self.assertRaises(ValueError):
+            mapped.view[0]
+
+        self.storage.save('empty.file', BytesIO(b''))
+        with self.storage.view('empty.file') as view:
+            self.assertEqual(len(view), 0)
+
+    def test_file_view_exported_slices(self):
+        self.storage.save('mapped.file', BytesIO(b'0123456789'))
+        mapped = self.storage.view('mapped.file')
+        head = mapped.view[:4]
+        with self.assertRaises(BufferError):
+            mapped.close()
+        head.release()
+
+    def test_walk(self):
+        for name in ('a/x.txt', 'a/b/y.txt', 'a-c.txt', 'z.txt'):
+            self.storage.save(name, BytesIO(b'1234'))
+
+        entries = list(self.storage.walk())
+        self.assertEqual(
+            [(entry.name, entry.is_dir) for entry in entries],
+            [('a', True), ('a/b', True), ('a/b/y.txt', False), ('a/x.txt', False),
+             ('a-c.txt', False), ('z.txt', False)],
+        )
+        self.assertEqual(entries[2].size, 4)
+        self.assertIsNone(entries[0].size)
+        self.assertIsNotNone(entries[2].modified.tzinfo)
+
+        self.assertEqual(
+            [entry.name for entry in self.storage.iter_files('a')], ['a/b/y.txt', 'a/x.txt']
+        )
+
+    def test_walk_pages(self):
+        names = ['d{}/f{}'.format(i % 3, i) for i in range(10)]
+        for name in names:
+            self.storage.save(name, BytesIO(b'x'))
+
+        seen, cursor = [], None
+        while True:
+            page = [entry.name for entry in self.storage.iter_files(page_size=4, cursor=cursor)]
+            if not page:
+                break
+            self.assertLessEqual(len(page), 4)
+            seen.extend(page)
+            cursor = page[-1]
+        self.assertEqual(sorted(seen), sorted(names))
+        self.assertEqual(len(seen), len(set(seen)))
+
+        # a directory as cursor resumes inside it.
+        self.assertEqual(
+            [entry.name for entry in self.storage.walk(cursor='d2')][:2], ['d2/f2', 'd2/f5']
+        )
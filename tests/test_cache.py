@@ -0,0 +1,103 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+from io import BytesIO
+from unittest import TestCase
+
+from flask_lagerung import CachedStorage, FileSystemStorage
+
+
+class CountingStorage(FileSystemStorage):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.opened = 0
+        self.delay = 0
+
+    def open(self, name, mode="rb"):
+        self.opened += 1
+        time.sleep(self.delay)
+        return super().open(name, mode)
+
+
+class CachedStorageTests(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.remote = CountingStorage(location=os.path.join(self.temp_dir, 'remote'))
+        self.cache = FileSystemStorage(location=os.path.join(self.temp_dir, 'cache'))
+        self.storage = CachedStorage(self.remote, self.cache, max_bytes=25)
+
+        for name in ('a', 'b', 'c'):
+            self.remote.save('dir/' + name, BytesIO(name.encode() * 10))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def read(self, name):
+        with self.storage.open(name) as f:
+            return f.read()
+
+    def test_hit_and_miss(self):
+        self.assertEqual(self.read('dir/a'), b'a' * 10)
+        self.assertEqual(self.read('dir/a'), b'a' * 10)
+        self.assertEqual(self.remote.opened, 1)
+        self.assertTrue(self.cache.exists('dir/a'))
+
+        stats = self.storage.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['bytes']), (1, 1, 10))
+
+    def test_lru_eviction(self):
+        self.read('dir/a')
+        self.read('dir/b')
+        self.read('dir/a')
+        self.read('dir/c')
+
+        self.assertFalse(self.cache.exists('dir/b'))
+        self.assertTrue(self.cache.exists('dir/a'))
+        self.assertTrue(self.cache.exists('dir/c'))
+        self.assertEqual(self.storage.stats()['evictions'], 1)
+        self.assertEqual(self.storage.stats()['bytes'], 20)
+
+    def test_invalidation(self):
+        self.read('dir/a')
+        self.storage.save('dir/a', BytesIO(b'new'))
+        self.assertFalse(self.cache.exists('dir/a'))
+        self.assertEqual(self.read('dir/a'), b'new')
+
+        self.storage.delete('dir/a')
+        self.assertFalse(self.cache.exists('dir/a'))
+        self.assertFalse(self.storage.exists('dir/a'))
+
+    def test_single_flight(self):
+        self.remote.delay = 0.05
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(self.read('dir/a')))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, [b'a' * 10] * 5)
+        self.assertEqual(self.remote.opened, 1)
+        self.assertEqual(self.storage.stats()['misses'], 1)
+
+    def test_fill_after_concurrent_fill(self):
+        self.read('dir/a')
+        # open() missed just before another thread's download ended.
+        with self.storage._fill('dir/a', 'rb') as f:
+            self.assertEqual(f.read(), b'a' * 10)
+        self.assertEqual(self.remote.opened, 1)
+        stats = self.storage.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+    def test_existing_cache_is_indexed(self):
+        self.read('dir/a')
+        storage = CachedStorage(self.remote, self.cache, max_bytes=25)
+        self.assertEqual(storage.stats()['entries'], 1)
+        with storage.open('dir/a') as f:
+            self.assertEqual(f.read(), b'a' * 10)
+        self.assertEqual(self.remote.opened, 1)
@@ -0,0 +1,181 @@
+import gzip
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from io import BytesIO, StringIO
+
+try:
+    from flask import Flask
+except ImportError:
+    Flask = None
+
+from flask_lagerung import CompressedStorage, FileSystemStorage
+from flask_lagerung.compression import (
+    CompressingReader,
+    available_codecs,
+    get_codec,
+)
+
+TEXT = b'{"name": "lagerung", "values": [1, 2, 3]}\n' * 1000
+
+
+class Pipe:
+    def __init__(self, data):
+        self.stream = BytesIO(data)
+
+    def read(self, size=-1):
+        return self.stream.read(size)
+
+    def seekable(self):
+        return False
+
+
+class CompressingReaderTests(unittest.TestCase):
+    def setUp(self):
+        self.codec = get_codec('gzip')
+
+    def test_read(self):
+        reader = CompressingReader(BytesIO(TEXT), self.codec, chunk_size=100)
+        compressed = reader.read()
+        self.assertLess(len(compressed), len(TEXT))
+        self.assertEqual(gzip.decompress(compressed), TEXT)
+        self.assertEqual(reader.tell(), len(compressed))
+
+    def test_seek_resumes(self):
+        whole = CompressingReader(BytesIO(TEXT), self.codec, chunk_size=100).read()
+
+        reader = CompressingReader(BytesIO(TEXT), self.codec, chunk_size=100)
+        reader.read(50)
+        self.assertEqual(reader.seek(20), 20)
+        self.assertEqual(reader.read(), whole[20:])
+        reader.seek(0)
+        self.assertEqual(reader.read(), whole)
+
+        with self.assertRaises(io.UnsupportedOperation):
+            reader.seek(0, io.SEEK_END)
+
+    def test_not_seekable(self):
+        reader = CompressingReader(Pipe(TEXT), self.codec)
+        self.assertFalse(reader.seekable())
+        self.assertEqual(reader.seek(0), 0)
+        self.assertEqual(gzip.decompress(reader.read()), TEXT)
+        with self.assertRaises(io.UnsupportedOperation):
+            reader.seek(0)
+
+    def test_text(self):
+        reader = CompressingReader(StringIO('grüße'), self.codec)
+        self.assertEqual(gzip.decompress(reader.read()), 'grüße'.encode('utf-8'))
+
+    def test_codecs(self):
+        self.assertIn('gzip', available_codecs())
+        with self.assertRaises(ValueError):
+            get_codec('lzma')
+
+
+class CompressedStorageTests(unittest.TestCase):
+    codec = 'gzip'
+
+    def setUp(self):
+        if self.codec not in available_codecs():
+            self.skipTest('{} is not installed'.format(self.codec))
+        self.temp_dir = tempfile.mkdtemp()
+        self.backend = FileSystemStorage(location=self.temp_dir)
+        self.storage = CompressedStorage(self.backend, codec=self.codec)
+        self.suffix = self.storage.codec.suffix
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_save_open(self):
+        self.storage.save('exports/data.json', BytesIO(TEXT))
+        stored = os.path.join(self.temp_dir, 'exports', 'data.json' + self.suffix)
+        self.assertTrue(os.path.exists(stored))
+        self.assertLess(os.path.getsize(stored), len(TEXT))
+
+        with self.storage.open('exports/data.json') as f:
+            self.assertEqual(f.read(), TEXT)
+        with self.storage.open('exports/data.json', 'r') as f:
+            self.assertEqual(f.read(), TEXT.decode())
+
+        self.assertTrue(self.storage.exists('exports/data.json'))
+        self.assertEqual(self.storage.size('exports/data.json'), len(TEXT))
+        self.assertEqual(self.storage.listdir('exports'), ([], ['data.json']))
+        self.assertEqual(self.storage.path('exports/data.json'), stored)
+
+        self.storage.delete('exports/data.json')
+        self.assertFalse(self.storage.exists('exports/data.json'))
+
+    def test_save_partly_read_stream(self):
+        # like the other storages, the whole stream is saved.
+        stream = BytesIO(b'hello world')
+        stream.read(5)
+        self.storage.save('hello.txt', stream)
+        with self.storage.open('hello.txt') as f:
+            self.assertEqual(f.read(), b'hello world')
+
+    def test_binary_files_are_not_compressed(self):
+        self.storage.save('image.png', BytesIO(b'\x89PNG'))
+        self.assertTrue(os.path.exists(os.path.join(self.temp_dir, 'image.png')))
+        with self.storage.open('image.png') as f:
+            self.assertEqual(f.read(), b'\x89PNG')
+        self.assertEqual(self.storage.listdir(''), ([], ['image.png']))
+
+    def test_write(self):
+        with self.storage.open('notes.txt', 'wb') as f:
+            f.write(b'hello ')
+            f.write(b'world')
+        with self.storage.open('notes.txt') as f:
+            self.assertEqual(f.read(), b'hello world')
+
+        with self.assertRaises(ValueError):
+            self.storage.open('notes.txt', 'ab')
+
+
+class ZstdCompressedStorageTests(CompressedStorageTests):
+    codec = 'zstd'
+
+
+class BrotliCompressedStorageTests(CompressedStorageTests):
+    codec = 'brotli'
+
+
+@unittest.skipIf(Flask is None, "Flask is not installed")
+class CompressedServeTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.storage = CompressedStorage(FileSystemStorage(location=self.temp_dir))
+        self.storage.save('data.json', BytesIO(TEXT))
+
+        self.app = Flask(__name__)
+        self.app.add_url_rule(
+            '/media/<path:name>', 'media', lambda name: self.storage.serve(name)
+        )
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_serve_compressed(self):
+        response = self.client.get('/media/data.json', headers={'Accept-Encoding': 'gzip, br'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(response.mimetype, 'application/json')
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        self.assertEqual(gzip.decompress(response.data), TEXT)
+        self.assertLess(response.content_length, len(TEXT))
+        response.close()
+
+    def test_serve_decompressed(self):
+        response = self.client.get('/media/data.json')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertEqual(response.content_length, len(TEXT))
+        self.assertEqual(response.data, TEXT)
+        response.close()
+
+        response = self.client.get('/media/data.json', headers={'Range': 'bytes=0-3'})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.data, TEXT[:4])
+        response.close()
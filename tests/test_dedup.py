@@ -0,0 +1,78 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import TestCase
+
+from flask_lagerung import DedupStorage, FileSystemStorage
+
+
+class DedupStorageTests(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.backend = FileSystemStorage(location=os.path.join(self.temp_dir, 'blobs'))
+        self.storage = DedupStorage(self.backend, os.path.join(self.temp_dir, 'index.db'))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def blob_count(self):
+        return sum(len(files) for _, _, files in os.walk(self.backend.location))
+
+    def test_identical_content_stored_once(self):
+        self.storage.save('a.txt', BytesIO(b'same content'))
+        self.storage.save('dir/b.txt', BytesIO(b'same content'))
+        self.storage.save('c.txt', BytesIO(b'other content'))
+
+        self.assertEqual(self.blob_count(), 2)
+        with self.storage.open('dir/b.txt') as f:
+            self.assertEqual(f.read(), b'same content')
+
+        stats = self.storage.stats()
+        self.assertEqual((stats['uploads'], stats['deduplicated']), (2, 1))
+        self.assertEqual(stats['logical_bytes'], 37)
+        self.assertEqual(stats['stored_bytes'], 25)
+
+    def test_reference_counting(self):
+        self.storage.save('a.txt', BytesIO(b'same content'))
+        self.storage.save('b.txt', BytesIO(b'same content'))
+
+        self.storage.delete('a.txt')
+        self.assertFalse(self.storage.exists('a.txt'))
+        self.assertEqual(self.blob_count(), 1)
+
+        # overwriting drops the reference to the previous content.
+        self.storage.save('b.txt', BytesIO(b'new content'))
+        self.assertEqual(self.blob_count(), 1)
+        self.storage.delete('b.txt')
+        self.assertEqual(self.blob_count(), 0)
+
+    def test_metadata_and_listdir(self):
+        self.storage.save('dir/a.txt', BytesIO(b'aaa'))
+        self.storage.save('dir/sub/b.txt', BytesIO(b'bb'))
+        self.storage.save('c.txt', BytesIO(b'c'))
+
+        self.assertEqual(self.storage.size('dir/sub/b.txt'), 2)
+        self.assertIsNotNone(self.storage.modified_time('dir/a.txt').tzinfo)
+        self.assertTrue(self.storage.exists('dir/sub'))
+        self.assertEqual(self.storage.listdir(''), (['dir'], ['c.txt']))
+        self.assertEqual(self.storage.listdir('dir'), (['sub'], ['a.txt']))
+
+        with self.assertRaises(FileNotFoundError):
+            self.storage.size('missing')
+
+        # walking falls back on listdir, size and modified_time.
+        self.assertEqual(
+            [(entry.name, entry.size) for entry in self.storage.walk()],
+            [('c.txt', 1), ('dir', None), ('dir/a.txt', 3), ('dir/sub', None), ('dir/sub/b.txt', 2)],
+        )
+
+    def test_index_persists(self):
+        self.storage.save('a.txt', BytesIO(b'content'))
+        storage = DedupStorage(self.backend, os.path.join(self.temp_dir, 'index.db'))
+        with storage.open('a.txt') as f:
+            self.assertEqual(f.read(), b'content')
+
+    def test_read_only(self):
+        with self.assertRaises(ValueError):
+            self.storage.open('a.txt', 'wb')
@@ -0,0 +1,124 @@
+import shutil
+import tempfile
+import unittest
+from io import BytesIO
+
+try:
+    from flask import Flask
+except ImportError:
+    Flask = None
+
+from flask_lagerung import FileSystemStorage, InstrumentedStorage, Metrics
+
+
+class RoundTripStorage(FileSystemStorage):
+    """Pretends every call costs one round trip."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sent = 0
+
+    def thread_round_trips(self):
+        return self.sent
+
+    def exists(self, name):
+        self.sent += 1
+        return super().exists(name)
+
+
+class InstrumentedStorageTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.events = []
+        self.metrics = Metrics()
+        self.storage = InstrumentedStorage(
+            FileSystemStorage(location=self.temp_dir), [self.events.append, self.metrics]
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_events(self):
+        self.storage.save('dir/file', BytesIO(b'0123456789'))
+        with self.storage.open('dir/file') as f:
+            self.assertEqual(f.read(4), b'0123')
+            self.assertEqual(f.read(), b'456789')
+        self.assertTrue(self.storage.exists('dir/file'))
+        self.assertEqual(self.storage.listdir('dir'), ([], ['file']))
+        self.storage.delete('dir/file')
+
+        self.assertEqual(
+            [event.operation for event in self.events],
+            ['save', 'open', 'read', 'exists', 'listdir', 'delete'],
+        )
+        save, _, read = self.events[:3]
+        self.assertEqual((save.backend, save.name, save.bytes), ('FileSystemStorage', 'dir/file', 10))
+        self.assertEqual(read.bytes, 10)
+        self.assertIsNone(read.round_trips)
+        self.assertTrue(all(event.ok and event.duration >= 0 for event in self.events))
+
+    def test_error_events(self):
+        with self.assertRaises(FileNotFoundError):
+            self.storage.open('missing')
+        with self.assertRaises(FileNotFoundError):
+            self.storage.size('missing')
+
+        self.assertEqual([event.operation for event in self.events], ['open', 'size'])
+        self.assertIsInstance(self.events[0].error, FileNotFoundError)
+        self.assertFalse(self.events[1].ok)
+
+        series = self.metrics.snapshot()[('FileSystemStorage', 'size')]
+        self.assertEqual((series['count'], series['errors']), (1, 1))
+
+    def test_round_trips(self):
+        storage = InstrumentedStorage(RoundTripStorage(location=self.temp_dir), [self.events.append])
+        storage.exists('foo')
+        storage.exists('foo')
+        self.assertEqual([event.round_trips for event in self.events], [1, 1])
+        self.assertEqual(self.events[0].backend, 'RoundTripStorage')
+
+    def test_metrics(self):
+        for _ in range(3):
+            self.storage.save('file', BytesIO(b'abcd'))
+
+        series = self.metrics.snapshot()[('FileSystemStorage', 'save')]
+        self.assertEqual(series['count'], 3)
+        self.assertEqual(series['bytes'], 12)
+        self.assertEqual(series['buckets'][-1], (float('inf'), 3))
+
+        text = self.metrics.render()
+        self.assertIn(
+            'lagerung_operation_duration_seconds_bucket'
+            '{backend="FileSystemStorage",operation="save",le="+Inf"} 3',
+            text,
+        )
+        self.assertIn(
+            'lagerung_operation_bytes_total{backend="FileSystemStorage",operation="save"} 12',
+            text,
+        )
+
+        # the samples of a family follow its TYPE line, never interleaved.
+        self.storage.exists('file')
+        families = []
+        for line in self.metrics.render().splitlines():
+            if line.startswith('# TYPE '):
+                family = line.split()[2]
+                self.assertNotIn(family, families)
+                families.append(family)
+            else:
+                self.assertTrue(line.startswith(families[-1]), line)
+        self.assertEqual(len(families), 4)
+
+        self.metrics.reset()
+        self.assertEqual(self.metrics.snapshot(), {})
+
+    @unittest.skipIf(Flask is None, "Flask is not installed")
+    def test_metrics_view(self):
+        self.storage.exists('file')
+        app = Flask(__name__)
+        app.add_url_rule('/metrics', view_func=self.metrics.view)
+
+        response = app.test_client().get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/plain')
+        self.assertIn(b'operation="exists"', response.data)
@@ -0,0 +1,116 @@
+import threading
+from io import BytesIO, StringIO
+from unittest import TestCase
+
+from flask_lagerung import CachedStorage, MemoryStorage
+
+
+class MemoryStorageTests(TestCase):
+    def setUp(self):
+        self.storage = MemoryStorage(base_url='http://localhost/media/')
+
+    def test_save_open(self):
+        self.assertEqual(self.storage.save('dir/file.txt', BytesIO(b'content')), 'dir/file.txt')
+        with self.storage.open('dir/file.txt') as f:
+            self.assertEqual(f.read(), b'content')
+        with self.storage.open('/dir/file.txt', 'r') as f:
+            self.assertEqual(f.read(), 'content')
+
+        self.storage.save('text.txt', StringIO('grüße'))
+        self.assertEqual(self.storage.size('text.txt'), len('grüße'.encode('utf-8')))
+        self.assertIsNotNone(self.storage.modified_time('text.txt').tzinfo)
+
+        with self.assertRaises(FileNotFoundError):
+            self.storage.open('missing')
+        with self.assertRaises(FileNotFoundError):
+            self.storage.size('missing')
+
+    def test_write_modes(self):
+        with self.storage.open('log.txt', 'wb') as f:
+            f.write(b'one ')
+        with self.storage.open('log.txt', 'ab') as f:
+            f.write(b'two')
+        with self.storage.open('log.txt', 'a') as f:
+            f.write(' three')
+        with self.storage.open('log.txt') as f:
+            self.assertEqual(f.read(), b'one two three')
+
+        with self.assertRaises(ValueError):
+            self.storage.open('log.txt', 'r+')
+
+    def test_directories(self):
+        self.storage.save('a/b/c.txt', BytesIO(b'c'))
+        self.storage.save('a/d.txt', BytesIO(b'd'))
+        self.storage.save('e.txt', BytesIO(b'e'))
+
+        self.assertEqual(self.storage.listdir(''), (['a'], ['e.txt']))
+        self.assertEqual(self.storage.listdir('a'), (['b'], ['d.txt']))
+        self.assertEqual(self.storage.listdir('a/b/'), ([], ['c.txt']))
+        self.assertTrue(self.storage.exists('a/b'))
+        self.assertEqual(
+            [entry.name for entry in self.storage.walk()],
+            ['a', 'a/b', 'a/b/c.txt', 'a/d.txt', 'e.txt'],
+        )
+
+        with self.assertRaises(IOError):
+            self.storage.save('a', BytesIO(b'x'))
+        with self.assertRaises(IOError):
+            self.storage.save('e.txt/f', BytesIO(b'x'))
+
+        self.storage.delete('a/b/c.txt')
+        self.assertFalse(self.storage.exists('a/b'))
+        self.assertEqual(self.storage.listdir('a'), ([], ['d.txt']))
+        self.storage.delete('missing')
+
+    def test_url(self):
+        self.assertEqual(self.storage.url('dir/my file.txt'), 'http://localhost/media/dir/my%20file.txt')
+        with self.assertRaises(ValueError):
+            MemoryStorage().url('file')
+
+    def test_budget(self):
+        storage = MemoryStorage(max_bytes=10)
+        storage.save('a', BytesIO(b'aaaa'))
+        storage.save('b', BytesIO(b'bbbb'))
+        storage.open('a').close()
+        storage.save('c', BytesIO(b'cccc'))
+
+        # b was the least recently used.
+        self.assertTrue(storage.exists('a'))
+        self.assertFalse(storage.exists('b'))
+        self.assertEqual(storage.stats(), {'entries': 2, 'bytes': 8, 'max_bytes': 10, 'evictions': 1})
+
+        storage.save('a', BytesIO(b'aa'))
+        self.assertEqual(storage.stats()['bytes'], 6)
+
+        with self.assertRaises(ValueError):
+            storage.save('big', BytesIO(b'x' * 11))
+
+    def test_threads(self):
+        storage = MemoryStorage(max_bytes=1000)
+
+        def worker(index):
+            for i in range(100):
+                storage.save('t{}/f{}'.format(index, i), BytesIO(b'x' * 10))
+                storage.exists('t{}/f{}'.format(index, i))
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        stats = storage.stats()
+        self.assertEqual(stats['bytes'], 1000)
+        self.assertEqual(stats['entries'], 100)
+        self.assertEqual(stats['evictions'], 700)
+
+    def test_hot_tier(self):
+        remote = MemoryStorage()
+        remote.save('a', BytesIO(b'aaaa'))
+        storage = CachedStorage(remote, self.storage, max_bytes=100)
+
+        for _ in range(2):
+            with storage.open('a') as f:
+                self.assertEqual(f.read(), b'aaaa')
+        self.assertEqual((storage.hits, storage.misses), (1, 1))
+        self.assertTrue(self.storage.exists('a'))
@@ -0,0 +1,108 @@
+import threading
+import time
+from unittest import TestCase
+
+from flask_lagerung.pool import ConnectionPool, PoolTimeout
+
+
+class Connection:
+    def __init__(self):
+        self.closed = False
+
+
+def close(connection):
+    connection.closed = True
+
+
+class ConnectionPoolTest(TestCase):
+    def setUp(self):
+        self.pool = ConnectionPool(Connection, close=close, max_size=2, timeout=0.05)
+
+    def test_reuse_idle_connection(self):
+        conn = self.pool.acquire()
+        self.pool.release(conn)
+        self.assertIs(self.pool.acquire(), conn)
+        self.assertEqual(self.pool.stats()['created'], 1)
+
+    def test_bounded_size(self):
+        first = self.pool.acquire()
+        second = self.pool.acquire()
+        self.assertIsNot(first, second)
+
+        with self.assertRaises(PoolTimeout):
+            self.pool.acquire()
+
+        stats = self.pool.stats()
+        self.assertEqual(stats['in_use'], 2)
+        self.assertEqual(stats['waits'], 1)
+
+    def test_waiter_gets_released_connection(self):
+        conn = self.pool.acquire()
+        self.pool.acquire()
+        timer = threading.Timer(0.01, self.pool.release, (conn,))
+        timer.start()
+        self.assertIs(self.pool.acquire(timeout=1), conn)
+        timer.join()
+
+    def test_discard(self):
+        conn = self.pool.acquire()
+        self.pool.release(conn, discard=True)
+        self.assertTrue(conn.closed)
+
+        stats = self.pool.stats()
+        self.assertEqual(stats['size'], 0)
+        self.assertEqual(stats['discarded'], 1)
+        self.assertIsNot(self.pool.acquire(), conn)
+
+    def test_idle_timeout(self):
+        pool = ConnectionPool(Connection, close=close, min_size=1, idle_timeout=0)
+        first = pool.acquire()
+        second = pool.acquire()
+        pool.release(first)
+        pool.release(second)
+        time.sleep(0.01)
+
+        # min_size connections survive the idle timeout.
+        pool.acquire()
+        self.assertEqual(pool.stats()['size'], 1)
+        self.assertTrue(first.closed != second.closed)
+
+    def test_max_lifetime(self):
+        pool = ConnectionPool(Connection, close=close, max_lifetime=0)
+        conn = pool.acquire()
+        time.sleep(0.01)
+        pool.release(conn)
+        self.assertTrue(conn.closed)
+
+    def test_ping_idle_connection(self):
+        pinged = []
+
+        def ping(connection):
+            pinged.append(connection)
+            if connection.closed:
+                raise IOError()
+
+        pool = ConnectionPool(Connection, close=close, ping=ping, ping_after=0)
+        conn = pool.acquire()
+        pool.release(conn)
+        time.sleep(0.01)
+        self.assertIs(pool.acquire(), conn)
+        self.assertEqual(pinged, [conn])
+
+        # the peer closed it while it was idle.
+        pool.release(conn)
+        conn.closed = True
+        time.sleep(0.01)
+        fresh = pool.acquire()
+        self.assertIsNot(fresh, conn)
+        stats = pool.stats()
+        self.assertEqual((stats['size'], stats['discarded']), (1, 1))
+
+    def test_factory_error_frees_slot(self):
+        pool = ConnectionPool(self._fail, max_size=1, timeout=0)
+        with self.assertRaises(IOError):
+            pool.acquire()
+        self.assertEqual(pool.stats()['size'], 0)
+
+    def _fail(self):
+        raise IOError()
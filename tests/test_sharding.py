@@ -0,0 +1,84 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import TestCase
+
+from flask_lagerung import FileSystemStorage
+from flask_lagerung.sharding import logical_name, reshard, shard_name
+
+
+class ShardingTests(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.storage = FileSystemStorage(
+            location=self.temp_dir, base_url='http://localhost/media/', shard_depth=2
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_shard_name(self):
+        sharded = shard_name('dir/file.txt', 2, 2)
+        self.assertRegex(sharded, r'^dir/_[0-9a-f]{2}/_[0-9a-f]{2}/file\.txt$')
+        self.assertEqual(shard_name('dir/file.txt', 0, 2), 'dir/file.txt')
+        self.assertEqual(logical_name(sharded, 2), 'dir/file.txt')
+        self.assertEqual(logical_name('file.txt', 2), 'file.txt')
+
+    def test_layout_is_transparent(self):
+        self.storage.save('dir/file.txt', BytesIO(b'content'))
+        path = self.storage.path('dir/file.txt')
+        self.assertEqual(
+            path, os.path.join(self.temp_dir, *shard_name('dir/file.txt', 2, 2).split('/'))
+        )
+        self.assertTrue(os.path.isfile(path))
+
+        with self.storage.open('dir/file.txt') as f:
+            self.assertEqual(f.read(), b'content')
+        self.assertTrue(self.storage.exists('dir/file.txt'))
+        self.assertTrue(self.storage.exists('dir'))
+        self.assertEqual(self.storage.size('dir/file.txt'), 7)
+        self.assertEqual(self.storage.listdir(''), (['dir'], []))
+        self.assertEqual(self.storage.listdir('dir'), ([], ['file.txt']))
+        self.assertEqual(
+            [entry.name for entry in self.storage.walk()], ['dir', 'dir/file.txt']
+        )
+        self.assertEqual(
+            self.storage.url('dir/file.txt'),
+            'http://localhost/media/' + shard_name('dir/file.txt', 2, 2),
+        )
+
+        self.storage.delete('dir/file.txt')
+        self.assertFalse(self.storage.exists('dir/file.txt'))
+
+    def test_shard_like_directories_are_refused(self):
+        with self.assertRaises(ValueError):
+            self.storage.save('_ab/file.txt', BytesIO(b'x'))
+
+    def test_reshard_online(self):
+        plain = FileSystemStorage(location=self.temp_dir)
+        names = ['f{}.txt'.format(i) for i in range(20)] + ['dir/g.txt']
+        for name in names:
+            plain.save(name, BytesIO(name.encode()))
+
+        # files not migrated yet are still found.
+        self.assertTrue(self.storage.exists('f1.txt'))
+        self.assertEqual(sorted(self.storage.listdir('')[1]), sorted(names[:-1]))
+
+        # saved through the new layout meanwhile, the newer content wins.
+        self.storage.save('f2.txt', BytesIO(b'new'))
+        self.assertEqual(reshard(self.storage, dry_run=True), 21)
+        self.assertEqual(reshard(self.storage), 21)
+        self.assertEqual(reshard(self.storage), 0)
+
+        for name in names:
+            self.assertTrue(os.path.exists(os.path.join(self.temp_dir, *shard_name(name, 2, 2).split('/'))))
+            self.assertFalse(os.path.exists(os.path.join(self.temp_dir, name)))
+        with self.storage.open('f2.txt') as f:
+            self.assertEqual(f.read(), b'new')
+        with self.storage.open('dir/g.txt') as f:
+            self.assertEqual(f.read(), b'dir/g.txt')
+
+        # and back to a plain tree.
+        self.assertEqual(reshard(FileSystemStorage(location=self.temp_dir)), 21)
+        self.assertEqual(sorted(os.listdir(self.temp_dir)), sorted(['dir'] + names[:-1]))
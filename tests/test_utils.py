@@ -0,0 +1,117 @@
+import os
+import tempfile
+from io import BytesIO, StringIO
+from unittest import TestCase
+from unittest.mock import patch
+
+from flask_lagerung.utils import (
+    DEFAULT_CHUNK_SIZE,
+    MAX_CHUNK_SIZE,
+    chunk_size_for,
+    copy_stream,
+    create_chunks,
+    iter_chunks,
+    kernel_copy,
+    stream_size,
+)
+
+
+class CopyStreamTests(TestCase):
+    def setUp(self):
+        self.source = tempfile.TemporaryFile()
+        self.source.write(b'0123456789' * 1000)
+        self.target = tempfile.TemporaryFile()
+
+    def tearDown(self):
+        self.source.close()
+        self.target.close()
+
+    def read_target(self):
+        self.target.seek(0)
+        return self.target.read()
+
+    def test_kernel_copy(self):
+        copied = kernel_copy(self.source.fileno(), self.target.fileno(), 0)
+        self.assertEqual(copied, 10000)
+        self.assertEqual(self.read_target(), b'0123456789' * 1000)
+
+    def test_kernel_copy_falls_back_to_sendfile(self):
+        with patch('os.copy_file_range', side_effect=OSError(18, 'EXDEV')):
+            copied = kernel_copy(self.source.fileno(), self.target.fileno(), 0)
+        self.assertEqual(copied, 10000)
+
+    def test_kernel_copy_unsupported(self):
+        with patch('os.copy_file_range', side_effect=OSError()), \
+                patch('os.sendfile', side_effect=OSError()):
+            self.assertIsNone(kernel_copy(self.source.fileno(), self.target.fileno(), 0))
+
+    def test_copy_stream_buffer(self):
+        copied = copy_stream(BytesIO(b'0123456789'), self.target, chunk_size=4)
+        self.assertEqual(copied, 10)
+        self.assertEqual(self.read_target(), b'0123456789')
+
+    def test_copy_stream_from_start(self):
+        self.source.seek(5000)
+        copy_stream(self.source, self.target)
+        self.assertEqual(len(self.read_target()), 10000)
+
+
+class Pipe:
+    """A non-seekable binary stream."""
+
+    def __init__(self, data):
+        self.stream = BytesIO(data)
+
+    def readinto(self, buffer):
+        return self.stream.readinto(buffer)
+
+    def read(self, size=-1):
+        return self.stream.read(size)
+
+    def seekable(self):
+        return False
+
+
+class ChunkTests(TestCase):
+    def test_reuse_buffer(self):
+        chunks = []
+        for chunk in create_chunks(BytesIO(b'0123456789'), 4, reuse_buffer=True):
+            self.assertIsInstance(chunk, memoryview)
+            chunks.append(chunk)
+            self.assertEqual(bytes(chunk), b'0123456789'[4 * (len(chunks) - 1):][:4])
+        self.assertEqual([len(chunk) for chunk in chunks], [4, 4, 2])
+        # the views share one buffer.
+        self.assertIs(chunks[0].obj, chunks[2].obj)
+
+    def test_create_chunks_rewinds(self):
+        stream = BytesIO(b'0123456789')
+        stream.seek(5)
+        self.assertEqual(b''.join(create_chunks(stream, 4)), b'0123456789')
+        stream.seek(5)
+        self.assertEqual(b''.join(iter_chunks(stream, 4)), b'56789')
+
+    def test_create_chunks_not_seekable(self):
+        chunks = list(create_chunks(Pipe(b'0123456789'), 4))
+        self.assertEqual(chunks, [b'0123', b'4567', b'89'])
+
+    def test_text_chunks(self):
+        self.assertEqual(list(create_chunks(StringIO('abcdef'), 4, reuse_buffer=True)), ['abcd', 'ef'])
+
+    def test_stream_size(self):
+        self.assertEqual(stream_size(BytesIO(b'0123456789')), 10)
+        self.assertIsNone(stream_size(Pipe(b'0123456789')))
+        with tempfile.TemporaryFile() as f:
+            f.write(b'x' * 100)
+            f.flush()
+            self.assertEqual(stream_size(f), 100)
+        read_fd, write_fd = os.pipe()
+        with os.fdopen(read_fd, 'rb') as r, os.fdopen(write_fd, 'wb'):
+            self.assertIsNone(stream_size(r))
+
+    def test_chunk_size_for(self):
+        self.assertEqual(chunk_size_for(BytesIO(b'0123456789')), 11)
+        self.assertEqual(chunk_size_for(Pipe(b'')), DEFAULT_CHUNK_SIZE)
+        self.assertEqual(chunk_size_for(BytesIO(bytes(DEFAULT_CHUNK_SIZE * 2))), DEFAULT_CHUNK_SIZE)
+        self.assertEqual(chunk_size_for(BytesIO(bytes(2 ** 24))), 2 ** 18)
+        self.assertEqual(chunk_size_for(BytesIO(bytes(2 ** 27))), MAX_CHUNK_SIZE)
+        self.assertEqual(chunk_size_for(BytesIO(bytes(2 ** 27)), maximum=2 ** 17), 2 ** 17)